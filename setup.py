@@ -16,12 +16,19 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     install_requires=[
           'pytz',
-          'pandas',
+          'numpy',
+          'pandas>=2.0',
     ],
+    extras_require={
+        'arrow': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': ['sunriset=sunriset.cli:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.8',
  )
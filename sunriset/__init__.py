@@ -9,239 +9,153 @@ Note: For individual, detailed calculations, run help(sunriset.calc).
 import datetime
 from datetime import timedelta
 
+import numpy as np
 import pandas as pd
 
-from . import calc
+from . import (
+    calc,
+    ephemeris,
+    insolation,
+    instrumentation,
+    orientation,
+    raster,
+    table,
+    vcalc,
+    window,
+)
+from .events import twilight
+from .export import to_arrow, to_parquet
+from .index import EventIndex
+from .insolation import daily_insolation, monthly_insolation
+from .instrumentation import instrument
+from .pipeline import COLUMNS, date_range, evaluate, total_days
+from .records import annotate, sun_position
+from .results import SolarDay, solar_day, to_array
+from .sites import sites_to_arrays, sites_to_pandas
+from .snap import SnappedCache
+from .stream import iter_batches
+from .timeseries import solar_position
 
 
-def to_pandas(start_date, lat, long, local_tz, number_of_years):
+# The time columns that a zone turns into local datetimes, with their floats.
+LOCAL_TIME_COLUMNS = {
+    "Solar Noon": "Solar Noon (float)",
+    "Sunrise": "Sunrise (float)",
+    "Sunset": "Sunset (float)",
+}
+
+
+def to_pandas(
+    start_date, lat, long, local_tz, number_of_years, columns=None, zone=None
+):
     """Returns a Pandas DataFrame of all the calculations for various solar projects.
     With a datetime.date for starting date, local latitude, lat, local Longitude, long
-    and local Time Zone as a positive or negative integer."""
+    and local Time Zone as a positive or negative integer.
+
+    The frame is built a column at a time with sunriset.vcalc. It has a daily
+    DatetimeIndex, float64 columns and timedelta64[ns] Solar Noon, Sunrise and
+    Sunset columns. Pass a list of names from sunriset.COLUMNS as columns to
+    compute only those and what they depend on. Date-only columns come from
+    the shared sunriset.ephemeris cache.
 
-    # this will evelntially be the daylight savings output:
+    On a polar day or night, when the sun never sets or never rises, the
+    Sunrise and Sunset columns are NaN or NaT and Sun Status says which.
+
+    With zone, a time zone name such as "America/Los_Angeles", Solar Noon,
+    Sunrise and Sunset are timezone aware datetimes in that zone, daylight
+    saving time included, instead of timedeltas in standard time."""
+
+    # Timedeltas are in standard time, daylight saving time comes with zone.
     tz_adjust = 0
-    year = int(start_date.year)
-    # Number of days claculation
-    total_days = sum(
-        366 if year % 4 == 0 and year % 100 != 0 or year % 400 == 0 else 365
-        for _y in range(1, number_of_years + 1)
+    dates = date_range(start_date, number_of_years)
+    columns = COLUMNS if columns is None else list(columns)
+    with instrumentation.stage("ephemeris"):
+        known = ephemeris.days(dates, local_tz, columns)
+    values = evaluate(
+        vcalc,
+        columns,
+        known=known,
+        date=dates,
+        lat=lat,
+        long=long,
+        local_tz=local_tz,
+        tz_adjust=tz_adjust,
     )
+    if zone is not None:
+        for name in set(columns).intersection(LOCAL_TIME_COLUMNS):
+            with instrumentation.stage("make_date_time"):
+                values[name] = vcalc.make_date_time(
+                    values[LOCAL_TIME_COLUMNS[name]], dates, local_tz, zone
+                )
+    with instrumentation.stage("frame"):
+        return pd.DataFrame({name: values[name] for name in columns}, index=dates)
 
-    dict_for_df = {}
-    for i in range(total_days):
-        # Our arguments are passed as positional maybe not best practice?
-        yr = start_date + datetime.timedelta(days=i)
-        julian_day = calc.julian_day(yr, local_tz)
-        julian_cent = calc.julian_century(julian_day)
-        sgml = calc.solar_geometric_mean_longitude(julian_cent)
-        sgma = calc.solar_geometric_mean_anomaly(julian_cent)
-        eceo = calc.eccentricity_earth_orbit(julian_cent)
-        seoc = calc.solar_equation_of_center(julian_cent, sgma)
-        stlg = calc.solar_true_longitude(sgml, seoc)
-        stan = calc.solar_true_anomaly(sgma, seoc)
-        svau = calc.solar_radius_vector_aus(eceo, stan)
-        salg = calc.solar_apparent_longitude(stlg, julian_cent)
-        mobe = calc.mean_obliquity_ecliptic(julian_cent)
-        ocor = calc.obliquity_correction_deg(mobe, julian_cent)
-        asce = calc.solar_accent_return(salg, ocor)
-        sdec = calc.solar_decline(ocor, salg)
-        vary = calc.var_y(ocor)
-        eqtm = calc.equation_of_time(vary, sgml, eceo, sgma)
-        hans = calc.hour_angle_sunrise(lat, sdec)
-        soln = calc.solar_noon_float(eqtm, long, local_tz)
-        srif = calc.sunrise_float(soln, hans)
-        setf = calc.sunset_float(soln, hans)
-        noon = calc.make_time(soln, yr, tz_adjust)
-        rise = calc.make_time(srif, yr, tz_adjust)
-        sset = calc.make_time(setf, yr, tz_adjust)
-        sdur = calc.sunlight_duration(hans)
-        trst = calc.true_solar_time_min(eqtm, long, local_tz)
-        hand = calc.hour_angle_deg(trst)
-        szen = calc.solar_zenith_angle(lat, sdec, hand)
-        sela = calc.solar_elevation_angle(szen)
-        aprx = calc.approx_atmospheric_refraction(sela)
-        atmr = calc.solar_elevation_corrected_atm_refraction(aprx, sela)
-        azmt = calc.solar_azimuth(hand, lat, szen, sdec)
-        dict_for_df[yr] = [
-            julian_day,
-            julian_cent,
-            sgml,
-            sgma,
-            eceo,
-            seoc,
-            stlg,
-            stan,
-            svau,
-            salg,
-            mobe,
-            ocor,
-            asce,
-            sdec,
-            vary,
-            eqtm,
-            hans,
-            soln,
-            srif,
-            setf,
-            noon,
-            rise,
-            sset,
-            sdur,
-            trst,
-            hand,
-            szen,
-            sela,
-            aprx,
-            atmr,
-            azmt,
-        ]
-    return pd.DataFrame.from_dict(
-        dict_for_df,
-        orient="index",
-        columns=[
-            "Julian Day",
-            "Julian Century",
-            "Solar Geometric Mean Longitude",
-            "Solar Geometric Mean Anomaly",
-            "Eccentricity Earth Orbit",
-            "Solar Equation of Center",
-            "Solar True Longitude",
-            "Solar True Anomaly",
-            "Solar Radius Vector AUs",
-            "Solar Apparent Longitude",
-            "Mean Obliquity of Ecliptic",
-            "Obliquity Correction Degrees",
-            "Solar Accent Return",
-            "Solar Decline",
-            "Var Y",
-            "Equation Of Time Min",
-            "Hour Angle Sunrise",
-            "Solar Noon (float)",
-            "Sunrise (float)",
-            "Sunset (float)",
-            "Solar Noon",
-            "Sunrise",
-            "Sunset",
-            "Sunlight Durration (minutes)",
-            "Ture Solar Time",
-            "Hour Angle Deg",
-            "Solar Zenith Angle (degrees)",
-            "Solar Elevation Angle (degrees)",
-            "Approximate Atmospheric Refraction (degrees)",
-            "Solar Elevation Corrected ATM Refraction (degrees)",
-            "Solar Azimuth Angle (degrees cw from North)",
-        ],
-    )
 
+def _python_values(value, length):
+    """Returns the column value, an array (or scalar) from vcalc, as a list of
+    length Python values: floats, str, and datetime.timedelta for timedelta64,
+    with None for NaT, as calc returns them."""
+    value = np.asarray(value)
+    if value.dtype.kind == "m":
+        value = value.astype("m8[us]")
+    return np.broadcast_to(value, (length,)).tolist()
 
-def to_dict(start_date, lat, long, local_tz, number_of_years):
-    """Returns a Pandas DataFrame of all the calculations for various solar projects.
-    With a datetime.date for starting date, Latitude, lat, local Longitude, long
-    and local Time Zone as a positive or negative integer."""
 
-    # this will evelntially be the daylight savings output:
+def to_dict(
+    start_date, lat, long, local_tz, number_of_years, columns=None, zone=None
+):
+    """Returns a dict of datetime.date to a list of all the calculations for various
+    solar projects, in the order of sunriset.COLUMNS. With a datetime.date for
+    starting date, Latitude, lat, local Longitude, long and local Time Zone as a
+    positive or negative integer. Pass a list of names from sunriset.COLUMNS as
+    columns to compute only those, in that order. On a polar day or night Sunrise
+    and Sunset are None, their floats NaN, and Sun Status says which.
+
+    The whole range is evaluated at once with sunriset.vcalc, with one entry
+    of the sunriset.ephemeris cache for it, as in to_pandas, and the rows hold
+    Python floats, str and datetime.timedelta. With zone, Solar Noon, Sunrise
+    and Sunset are timezone aware datetimes, as in to_pandas."""
+
+    # Timedeltas are in standard time, daylight saving time comes with zone.
     tz_adjust = 0
-    year = int(start_date.year)
-    # Number of days claculation
-    total_days = sum(
-        366 if year % 4 == 0 and year % 100 != 0 or year % 400 == 0 else 365
-        for _y in range(1, number_of_years + 1)
+    dates = date_range(start_date, number_of_years)
+    columns = COLUMNS if columns is None else list(columns)
+    with instrumentation.stage("ephemeris"):
+        known = ephemeris.days(dates, local_tz, columns)
+    values = evaluate(
+        vcalc,
+        columns,
+        known=known,
+        date=dates,
+        lat=lat,
+        long=long,
+        local_tz=local_tz,
+        tz_adjust=tz_adjust,
     )
-
-    dict_for_df = {}
-    for i in range(total_days):
-        # Our arguments are passed as positional maybe not best practice?
-        yr = start_date + datetime.timedelta(days=i)
-        julian_day = calc.julian_day(yr, local_tz)
-        julian_cent = calc.julian_century(julian_day)
-        sgml = calc.solar_geometric_mean_longitude(julian_cent)
-        sgma = calc.solar_geometric_mean_anomaly(julian_cent)
-        eceo = calc.eccentricity_earth_orbit(julian_cent)
-        seoc = calc.solar_equation_of_center(julian_cent, sgma)
-        stlg = calc.solar_true_longitude(sgml, seoc)
-        stan = calc.solar_true_anomaly(sgma, seoc)
-        svau = calc.solar_radius_vector_aus(eceo, stan)
-        salg = calc.solar_apparent_longitude(stlg, julian_cent)
-        mobe = calc.mean_obliquity_ecliptic(julian_cent)
-        ocor = calc.obliquity_correction_deg(mobe, julian_cent)
-        asce = calc.solar_accent_return(salg, ocor)
-        sdec = calc.solar_decline(ocor, salg)
-        vary = calc.var_y(ocor)
-        eqtm = calc.equation_of_time(vary, sgml, eceo, sgma)
-        hans = calc.hour_angle_sunrise(lat, sdec)
-        soln = calc.solar_noon_float(eqtm, long, local_tz)
-        srif = calc.sunrise_float(soln, hans)
-        setf = calc.sunset_float(soln, hans)
-        noon = calc.make_time(soln, yr, tz_adjust)
-        rise = calc.make_time(srif, yr, tz_adjust)
-        sset = calc.make_time(setf, yr, tz_adjust)
-        sdur = calc.sunlight_duration(hans)
-        trst = calc.true_solar_time_min(eqtm, long, local_tz)
-        hand = calc.hour_angle_deg(trst)
-        szen = calc.solar_zenith_angle(lat, sdec, hand)
-        sela = calc.solar_elevation_angle(szen)
-        aprx = calc.approx_atmospheric_refraction(sela)
-        atmr = calc.solar_elevation_corrected_atm_refraction(aprx, sela)
-        azmt = calc.solar_azimuth(hand, lat, szen, sdec)
-        dict_for_df[yr] = [
-            julian_day,
-            julian_cent,
-            sgml,
-            sgma,
-            eceo,
-            seoc,
-            stlg,
-            stan,
-            svau,
-            salg,
-            mobe,
-            ocor,
-            asce,
-            sdec,
-            vary,
-            eqtm,
-            hans,
-            soln,
-            srif,
-            setf,
-            noon,
-            rise,
-            sset,
-            sdur,
-            trst,
-            hand,
-            szen,
-            sela,
-            aprx,
-            atmr,
-            azmt,
-        ]
-    return dict_for_df
+    if zone is not None:
+        for name in set(columns).intersection(LOCAL_TIME_COLUMNS):
+            with instrumentation.stage("make_date_time"):
+                local = vcalc.make_date_time(
+                    values[LOCAL_TIME_COLUMNS[name]], dates, local_tz, zone
+                )
+            # None, not NaT, on a polar day or night, as without zone.
+            values[name] = np.where(local.isna(), None, local.to_pydatetime())
+    with instrumentation.stage("rows"):
+        cells = [_python_values(values[name], len(dates)) for name in columns]
+        rows = zip(*cells) if cells else [()] * len(dates)
+        return {day: list(row) for day, row in zip(dates.date, rows)}
 
 
 def sunrise_set_noon(date, lat, long, local_tz, tz_adjust=0):
-    julian_day = calc.julian_day(date, local_tz)
-    julian_cent = calc.julian_century(julian_day)
-    sgml = calc.solar_geometric_mean_longitude(julian_cent)
-    sgma = calc.solar_geometric_mean_anomaly(julian_cent)
-    eceo = calc.eccentricity_earth_orbit(julian_cent)
-    seoc = calc.solar_equation_of_center(julian_cent, sgma)
-    stlg = calc.solar_true_longitude(sgml, seoc)
-    # stan = calc.solar_true_anomaly(sgma, seoc)
-    # svau = calc.solar_radius_vector_aus(eceo, stan)
-    salg = calc.solar_apparent_longitude(stlg, julian_cent)
-    mobe = calc.mean_obliquity_ecliptic(julian_cent)
-    ocor = calc.obliquity_correction_deg(mobe, julian_cent)
-    # asce = calc.solar_accent_return(salg, ocor)
-    sdec = calc.solar_decline(ocor, salg)
-    vary = calc.var_y(ocor)
-    eqtm = calc.equation_of_time(vary, sgml, eceo, sgma)
-    hans = calc.hour_angle_sunrise(lat, sdec)
-    soln = calc.solar_noon_float(eqtm, long, local_tz)
-    srif = calc.sunrise_float(soln, hans)
-    setf = calc.sunset_float(soln, hans)
-    noon = calc.make_time(soln, date, tz_adjust)
-    rise = calc.make_time(srif, date, tz_adjust)
-    sset = calc.make_time(setf, date, tz_adjust)
-    return (rise, sset, noon)
+    """Returns a tuple of datetime.timedelta for Sunrise, Sunset and Solar Noon on
+    date, since local midnight. Sunrise and Sunset are None on a polar day or night.
+
+    The date-only values come from the shared sunriset.ephemeris cache and the
+    few site-specific steps are called directly, so a cache hit costs less
+    than evaluating the chain."""
+    known = ephemeris.day(date, local_tz)
+    hans = calc.hour_angle_sunrise(lat, known["Solar Decline"])
+    soln = calc.solar_noon_float(known["Equation Of Time Min"], long, local_tz)
+    rise = calc.make_time(calc.sunrise_float(soln, hans), date, tz_adjust)
+    sset = calc.make_time(calc.sunset_float(soln, hans), date, tz_adjust)
+    return (rise, sset, calc.make_time(soln, date, tz_adjust))
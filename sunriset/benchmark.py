@@ -0,0 +1,252 @@
+# This file is released under the MIT License OSI Approved.
+"""A reproducible benchmark suite for sunriset.
+
+run() times every calc function, sunrise_set_noon, to_pandas and to_dict
+over 1 to 100 years, and sites_to_arrays over 1 to 100,000 sites, and saves
+their throughput and peak memory to a JSON file. compare() reads two such
+files and flags the cases that got slower or use more memory.
+
+    $ python -m sunriset.benchmark run -o before.json
+    $ python -m sunriset.benchmark run -o after.json
+    $ python -m sunriset.benchmark compare before.json after.json
+
+Each case is timed with timeit: the number of calls is chosen to take at
+least 0.2 seconds and the best of repeat such runs is kept. Peak memory is
+measured by tracemalloc (which numpy reports its arrays to) in a separate
+call, so it does not slow the timing. The inputs are fixed, and the sites are
+drawn from a seeded random generator, so runs on one machine are comparable.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import sunriset
+
+from . import calc, ephemeris
+from .pipeline import COLUMNS, GRAPH, evaluate
+
+START_DATE = datetime.date(2019, 1, 1)
+SITE = (34.0522, -118.2437, -8)
+YEARS = (1, 10, 100)
+SITES = (1, 100, 10000, 100000)
+QUICK_YEARS = (1, 10)
+QUICK_SITES = (1, 100, 10000)
+SITE_COLUMNS = ["Sunrise", "Sunset", "Solar Noon"]
+# A slowdown, or growth in peak memory, beyond which compare flags a case.
+THRESHOLD = 0.1
+# Growth in peak memory, in bytes, too small to flag whatever the ratio.
+MEMORY_SLACK = 2**20
+
+
+class Case:
+    """A benchmark: function, called with no arguments, processes items units
+    (calls, days or site-days) each time."""
+
+    def __init__(self, name, function, items=1, unit="calls"):
+        self.name = name
+        self.function = function
+        self.items = items
+        self.unit = unit
+
+
+def _calc_cases():
+    values = evaluate(
+        calc,
+        COLUMNS,
+        date=START_DATE,
+        lat=SITE[0],
+        long=SITE[1],
+        local_tz=SITE[2],
+        tz_adjust=0,
+    )
+    values.update(date=START_DATE, lat=SITE[0], long=SITE[1], local_tz=SITE[2])
+    values.update(tz_adjust=0)
+    cases = {}
+    for function_name, arguments in GRAPH.values():
+        function = getattr(calc, function_name)
+        args = [values[name] for name in arguments]
+        cases[function_name] = Case(
+            "calc.{}".format(function_name),
+            lambda function=function, args=args: function(*args),
+        )
+    return list(cases.values())
+
+
+def _sites(count):
+    generator = np.random.default_rng(0)
+    lat = generator.uniform(-60, 60, count)
+    long = generator.uniform(-180, 180, count)
+    # The standard time zone of each longitude.
+    return lat, long, np.round(long / 15)
+
+
+def cases(years=YEARS, sites=SITES):
+    """Returns the list of Cases for the year and site scales."""
+    result = _calc_cases()
+
+    def sunrise_set_noon():
+        ephemeris.cache_clear()
+        sunriset.sunrise_set_noon(START_DATE, *SITE)
+
+    result.append(Case("sunrise_set_noon", sunrise_set_noon))
+    result.append(
+        Case(
+            "sunrise_set_noon[cached]",
+            lambda: sunriset.sunrise_set_noon(START_DATE, *SITE),
+        )
+    )
+    for number_of_years in years:
+        days = sunriset.total_days(START_DATE, number_of_years)
+        for name in ("to_pandas", "to_dict"):
+            function = getattr(sunriset, name)
+
+            def run(function=function, number_of_years=number_of_years):
+                ephemeris.cache_clear()
+                function(START_DATE, *SITE, number_of_years)
+
+            label = "{}[years={}]".format(name, number_of_years)
+            result.append(Case(label, run, days, "days"))
+    for count in sites:
+        lat, long, local_tz = _sites(count)
+        days = sunriset.total_days(START_DATE, 1)
+
+        def run(lat=lat, long=long, local_tz=local_tz):
+            ephemeris.cache_clear()
+            sunriset.sites_to_arrays(START_DATE, lat, long, local_tz, 1, SITE_COLUMNS)
+
+        label = "sites_to_arrays[sites={}]".format(count)
+        result.append(Case(label, run, count * days, "site-days"))
+    return result
+
+
+def measure(case, repeat=3):
+    """Returns a dict of the best time per call, throughput and peak memory of
+    case."""
+    timer = timeit.Timer(case.function)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        case.function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": seconds,
+        "items": case.items,
+        "unit": case.unit,
+        "throughput": case.items / seconds,
+        "peak_bytes": peak,
+    }
+
+
+def environment():
+    """Returns a dict describing the machine and library versions."""
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def run(path=None, quick=False, match=None, repeat=3, out=None):
+    """Runs the benchmarks, those with match in their name if given, prints
+    one line per case to out (stdout by default) and returns the results, also
+    saved to path as JSON if given. quick leaves out the 100 year and 100,000
+    site cases."""
+    out = out or sys.stdout
+    selected = cases(QUICK_YEARS, QUICK_SITES) if quick else cases()
+    if match:
+        selected = [case for case in selected if match in case.name]
+    results = {}
+    for case in selected:
+        results[case.name] = result = measure(case, repeat)
+        print(
+            "{:<48} {:>14,.0f} {:<11} {:>9.1f} MiB".format(
+                case.name,
+                result["throughput"],
+                case.unit + "/s",
+                result["peak_bytes"] / 2**20,
+            ),
+            file=out,
+        )
+    report = {"environment": environment(), "results": results}
+    if path:
+        with open(path, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return report
+
+
+def compare(base, new, threshold=THRESHOLD):
+    """Returns a list of (case name, throughput ratio, peak memory ratio,
+    regressed) for the cases in both base and new, run() reports or the paths
+    of their JSON files. A case regressed when its throughput fell, or its peak
+    memory grew (by more than MEMORY_SLACK bytes), by more than threshold."""
+    reports = []
+    for report in (base, new):
+        if isinstance(report, str):
+            with open(report) as fh:
+                report = json.load(fh)
+        reports.append(report["results"])
+    base, new = reports
+
+    rows = []
+    for name in base:
+        if name not in new:
+            continue
+        speed = new[name]["throughput"] / base[name]["throughput"]
+        growth = new[name]["peak_bytes"] - base[name]["peak_bytes"]
+        memory = new[name]["peak_bytes"] / max(base[name]["peak_bytes"], 1)
+        regressed = speed < 1 - threshold or (
+            memory > 1 + threshold and growth > MEMORY_SLACK
+        )
+        rows.append((name, speed, memory, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sunriset.benchmark", description=__doc__.split("\n")[0]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="JSON file for the results")
+    run_parser.add_argument(
+        "--quick", action="store_true", help="skip 100 years and 100,000 sites"
+    )
+    run_parser.add_argument("-k", "--match", help="only cases with this in the name")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    options = parser.parse_args(argv)
+
+    if options.command == "run":
+        run(options.output, options.quick, options.match, options.repeat)
+        return 0
+    rows = compare(options.base, options.new, options.threshold)
+    print("{:<48} {:>10} {:>10}".format("case", "speed", "memory"))
+    for name, speed, memory, regressed in rows:
+        print(
+            "{:<48} {:>9.2f}x {:>9.2f}x{}".format(
+                name, speed, memory, "  REGRESSION" if regressed else ""
+            )
+        )
+    return 1 if any(row[3] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
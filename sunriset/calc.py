@@ -9,6 +9,10 @@ import pytz
 ordinal_adj = 1721424.5
 days_century = 2451545  # this is Saturday, A.D. 2000 Jan 1  in the Julian Calendar
 day_per_century = 36525
+# The Sun Status of a day on which the sun rises and sets, never sets, never rises.
+RISES_AND_SETS = ""
+POLAR_DAY = "polar day"
+POLAR_NIGHT = "polar night"
 
 
 def make_time(time_float: float, d_utz, tz_adjust: float) -> datetime.timedelta:
@@ -22,18 +26,33 @@ def make_time(time_float: float, d_utz, tz_adjust: float) -> datetime.timedelta:
         d_utz (): placeholder for inheritance
 
     Returns:
-        datetime.timedelta: a timedelta is in days and seconds.
+        datetime.timedelta: a timedelta is in days and seconds, or None
+        where time_float is NaN, as on a polar day or night.
     """
+    if math.isnan(time_float):
+        return None
     return datetime.timedelta(time_float + tz_adjust)
 
 
-def make_date_time(time_float, d_utz, tz_adjust):
-    """This function converts time_float to local datetime"""
+def make_date_time(time_float, d_utz, local_tz, local_pytz):
+    """This function converts time_float to a timezone aware local datetime.
+
+    Args:
+        time_float (float): In Days since midnight of d_utz in the standard
+        time of local_tz, as returned by sunrise_float for example.
+        d_utz (datetime.date): The local date.
+        local_tz (float): The standard time zone offset in hours that
+        time_float is measured in.
+        local_pytz: A pytz timezone, or its name, such as "America/Los_Angeles".
+
+    Returns:
+        datetime.datetime: in local_pytz, daylight saving time included.
+    """
+    if isinstance(local_pytz, str):
+        local_pytz = pytz.timezone(local_pytz)
     local_dt_midnight = datetime.datetime.combine(d_utz, datetime.time())
-    date_time = datetime.timedelta(time_float + tz_adjust)
-    dt = local_dt_midnight + date_time
-    dt = local_pytz.localize(dt)
-    return dt
+    dt = local_dt_midnight + datetime.timedelta(time_float - local_tz / 24)
+    return pytz.utc.localize(dt).astimezone(local_pytz)
 
 
 def julian_day(usr_date: datetime.date, tz: float = 0) -> float:
@@ -216,15 +235,32 @@ def equation_of_time(
     )
 
 
-def hour_angle_sunrise(lat, solar_decline):
-    """Returns Hour Angle, in degrees, with Latitude, lat and Solar Decline Deg, solar_decline"""
-    return math.degrees(
-        math.acos(
-            math.cos(math.radians(90.833))
-            / (math.cos(math.radians(lat)) * math.cos(math.radians(solar_decline)))
-            - math.tan(math.radians(lat)) * math.tan(math.radians(solar_decline))
-        )
-    )
+def _cos_hour_angle(lat, solar_decline, zenith):
+    return math.cos(math.radians(zenith)) / (
+        math.cos(math.radians(lat)) * math.cos(math.radians(solar_decline))
+    ) - math.tan(math.radians(lat)) * math.tan(math.radians(solar_decline))
+
+
+def hour_angle_sunrise(lat, solar_decline, zenith=90.833):
+    """Returns Hour Angle, in degrees, with Latitude, lat and Solar Decline Deg, solar_decline
+    at which the sun crosses the Zenith angle, zenith, which defaults to sunrise. It is
+    NaN where the sun never crosses it, on a polar day or night (see sun_status)."""
+    cos_hour_angle = _cos_hour_angle(lat, solar_decline, zenith)
+    if not -1 <= cos_hour_angle <= 1:
+        return math.nan
+    return math.degrees(math.acos(cos_hour_angle))
+
+
+def sun_status(lat, solar_decline, zenith=90.833):
+    """Returns POLAR_DAY where the sun stays above the Zenith angle, zenith, all day
+    with Latitude, lat and Solar Decline Deg, solar_decline, POLAR_NIGHT where it
+    stays below and RISES_AND_SETS otherwise."""
+    cos_hour_angle = _cos_hour_angle(lat, solar_decline, zenith)
+    if cos_hour_angle < -1:
+        return POLAR_DAY
+    if cos_hour_angle > 1:
+        return POLAR_NIGHT
+    return RISES_AND_SETS
 
 
 def solar_noon_float(equation_of_time, long, local_tz):
@@ -252,10 +288,11 @@ def sunlight_duration(hour_angle_sunrise):
     return 8 * hour_angle_sunrise
 
 
-def true_solar_time_min(equation_of_time, long, local_tz):
+def true_solar_time_min(equation_of_time, long, local_tz, time_of_day=0.5):
     """Returns True Solar time in minutes, with Equation of Time, equation_of_time,
-    Longitude, long and Local Time Zone, local tz."""
-    return (0.5 * 1440 + equation_of_time + 4 * long - 60 * local_tz) % 1440
+    Longitude, long, Local Time Zone, local tz and the local Time of Day,
+    time_of_day, as a fraction of a day, which defaults to noon."""
+    return (time_of_day * 1440 + equation_of_time + 4 * long - 60 * local_tz) % 1440
 
 
 def hour_angle_deg(true_solar_time):
@@ -265,16 +302,22 @@ def hour_angle_deg(true_solar_time):
     )
 
 
+def _acos_degrees(cosine):
+    """Returns the angle, in degrees, of cosine, or NaN where cosine is outside
+    [-1, 1], as it is at the poles."""
+    if not -1 <= cosine <= 1:
+        return math.nan
+    return math.degrees(math.acos(cosine))
+
+
 def solar_zenith_angle(lat: float, solar_decline: float, hour_angle: float) -> float:
     """Returns Solar Zenith Angle in Degrees, with Latitude, lat, Solar Decline (Degrees),
-    solar_decline, Hour Angle (Degrees), hour_angle."""
-    return math.degrees(
-        math.acos(
-            math.sin(math.radians(lat)) * math.sin(math.radians(solar_decline))
-            + math.cos(math.radians(lat))
-            * math.cos(math.radians(solar_decline))
-            * math.cos(math.radians(hour_angle))
-        )
+    solar_decline, Hour Angle (Degrees), hour_angle. It is NaN where it is undefined."""
+    return _acos_degrees(
+        math.sin(math.radians(lat)) * math.sin(math.radians(solar_decline))
+        + math.cos(math.radians(lat))
+        * math.cos(math.radians(solar_decline))
+        * math.cos(math.radians(hour_angle))
     )
 
 
@@ -326,45 +369,20 @@ def solar_azimuth(
     hour_angle: float, lat: float, solar_zenith_angle: float, solar_decline: float
 ) -> float:
     """Returns Solar Azimuth Angle Degrees Clockwise from North, with Latitude, lat and
-    Solar Zenith Angle, solar_zenith_angle and Solar Decline, solar_decline."""
-    return (
-        (
-            math.degrees(
-                math.acos(
-                    (
-                        (
-                            math.sin(math.radians(lat))
-                            * math.cos(math.radians(solar_zenith_angle))
-                        )
-                        - math.sin(math.radians(solar_decline))
-                    )
-                    / (
-                        math.cos(math.radians(lat))
-                        * math.sin(math.radians(solar_zenith_angle))
-                    )
-                )
-            )
-            + 180
-        )
-        % 360
-        if hour_angle > 0
-        else (
-            540
-            - math.degrees(
-                math.acos(
-                    (
-                        (
-                            math.sin(math.radians(lat))
-                            * math.cos(math.radians(solar_zenith_angle))
-                        )
-                        - math.sin(math.radians(solar_decline))
-                    )
-                    / (
-                        math.cos(math.radians(lat))
-                        * math.sin(math.radians(solar_zenith_angle))
-                    )
-                )
+    Solar Zenith Angle, solar_zenith_angle and Solar Decline, solar_decline. It is NaN
+    where it is undefined, as at the poles, where every direction is north or south."""
+    denominator = math.cos(math.radians(lat)) * math.sin(
+        math.radians(solar_zenith_angle)
+    )
+    # cos(radians(90)) is 6e-17, not 0, so test the poles themselves.
+    if abs(lat) == 90 or denominator == 0:
+        angle = math.nan
+    else:
+        angle = _acos_degrees(
+            (
+                math.sin(math.radians(lat)) * math.cos(math.radians(solar_zenith_angle))
+                - math.sin(math.radians(solar_decline))
             )
+            / denominator
         )
-        % 360
-    )
+    return (angle + 180) % 360 if hour_angle > 0 else (540 - angle) % 360
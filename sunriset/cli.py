@@ -0,0 +1,267 @@
+# This file is released under the MIT License OSI Approved.
+"""The sunriset command: solar tables for a file of sites.
+
+    $ sunriset sites.csv -o out.parquet --start 2019-01-01 --years 1 \\
+          --columns "Sunrise,Sunset" --chunk-size 1000 --workers 4
+
+The sites file, CSV or Parquet, has one row per site with id, lat, long and
+tz columns. It is read chunk_size sites at a time; each chunk is evaluated
+over the date range, batch_days days at a time, and written out before the
+next is read, so memory depends on the chunk size rather than on the number
+of sites. With --workers the chunks are evaluated by a process pool while the
+parent writes the finished ones, in order.
+
+The output, CSV or Parquet (by extension or --format), has a row per site
+and day: Site, Date and the selected columns. Site is the id as a string,
+exactly as written in the sites file. In CSV files Dates are written
+as YYYY-MM-DD and Sunrise, Sunset and Solar Noon as [-]HH:MM:SS.ffffff, which
+pandas.to_timedelta reads back. Both are written with pyarrow, which is
+installed with ``pip install sunriset[arrow]``.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .export import _batch_table, _pyarrow, _schema
+from .pipeline import COLUMNS, date_batches
+from .sites import evaluate_sites
+
+FORMATS = ("csv", "parquet")
+# Chunks each worker may have queued, bounding the results held in memory.
+CHUNKS_PER_WORKER = 2
+
+
+def _file_format(path, format=None):
+    format = format or os.path.splitext(path)[1].lstrip(".").lower()
+    if format not in FORMATS:
+        raise ValueError(
+            "Cannot tell the format of {}, use --format csv or parquet".format(path)
+        )
+    return format
+
+
+def read_sites(path, chunk_size, format=None, id_name="id"):
+    """Yields Pandas DataFrames of at most chunk_size rows of the sites file at
+    path, CSV or Parquet. The id_name column is read as str, so ids such as
+    "007" keep their zeros and every chunk has the same Site type."""
+    if _file_format(path, format) == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={id_name: str})
+    else:
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            if id_name in chunk.columns:
+                chunk[id_name] = chunk[id_name].astype(str)
+            yield chunk
+
+
+def _evaluate(dates, lat, long, local_tz, columns):
+    with np.errstate(invalid="ignore"):
+        return evaluate_sites(dates, lat, long, local_tz, columns, cache=False)
+
+
+def _tasks(sites, start_date, number_of_years, batch_days, names):
+    """Yields (site ids, dates, lat, long, local_tz) for every chunk of sites
+    and batch of days."""
+    id_name, lat_name, long_name, tz_name = names
+    for chunk in sites:
+        missing = [name for name in names if name not in chunk.columns]
+        if missing:
+            raise ValueError("Sites file has no {} column".format(", ".join(missing)))
+        site_ids = chunk[id_name].to_numpy(dtype=object)
+        lat, long, local_tz = (
+            chunk[name].values.astype(np.float64) for name in names[1:]
+        )
+        for dates in date_batches(start_date, number_of_years, batch_days, False):
+            yield site_ids, dates, lat, long, local_tz
+
+
+def _results(tasks, columns, workers):
+    """Yields (site ids, dates, values) for tasks, in order, evaluated by a pool
+    of workers processes unless workers is 1."""
+    if workers == 1:
+        for site_ids, dates, lat, long, local_tz in tasks:
+            yield site_ids, dates, _evaluate(dates, lat, long, local_tz, columns)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        queued = collections.deque()
+        for site_ids, dates, lat, long, local_tz in tasks:
+            future = pool.submit(_evaluate, dates, lat, long, local_tz, columns)
+            queued.append((site_ids, dates, future))
+            if len(queued) >= workers * CHUNKS_PER_WORKER:
+                site_ids, dates, future = queued.popleft()
+                yield site_ids, dates, future.result()
+        while queued:
+            site_ids, dates, future = queued.popleft()
+            yield site_ids, dates, future.result()
+
+
+def _clock_strings(pa, values):
+    """Returns a pyarrow array of the durations in values, an array of
+    timedelta64, as [-]HH:MM:SS.ffffff strings, null for NaT."""
+    micros = values.astype("m8[us]").astype(np.int64)
+    seconds, fraction = np.divmod(np.abs(micros), 1000000)
+    minutes, seconds = np.divmod(seconds, 60)
+    hours, minutes = np.divmod(minutes, 60)
+
+    def padded(part, width):
+        text = pa.compute.cast(pa.array(part), pa.string())
+        return pa.compute.utf8_lpad(text, width=width, padding="0")
+
+    strings = pa.compute.binary_join_element_wise(
+        pa.array(np.where(micros < 0, "-", "")),
+        padded(hours, 2),
+        ":",
+        padded(minutes, 2),
+        ":",
+        padded(seconds, 2),
+        ".",
+        padded(fraction, 6),
+        "",
+    )
+    return pa.compute.if_else(
+        pa.array(np.isnat(values)), pa.scalar(None, pa.string()), strings
+    )
+
+
+def _csv_table(pa, table):
+    """Returns table with its Date as dates and its durations as clock strings."""
+    for i, field in enumerate(table.schema):
+        if field.name == "Date":
+            column = table.column(i).cast(pa.date32())
+        elif pa.types.is_duration(field.type):
+            column = _clock_strings(pa, table.column(i).to_numpy())
+        else:
+            continue
+        table = table.set_column(i, pa.field(field.name, column.type), column)
+    return table
+
+
+def run(
+    sites_path,
+    output_path,
+    start_date,
+    number_of_years,
+    columns=None,
+    chunk_size=1000,
+    batch_days=366,
+    workers=1,
+    float32=False,
+    names=("id", "lat", "long", "tz"),
+    sites_format=None,
+    output_format=None,
+):
+    """Writes the solar calculations for every site in the file sites_path to
+    output_path, from start_date for number_of_years, and returns the number of
+    rows written. See the module docstring for the options."""
+    columns = COLUMNS if columns is None else list(columns)
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError("Unknown columns: {}".format(", ".join(sorted(unknown))))
+    output_format = _file_format(output_path, output_format)
+    sites = read_sites(sites_path, chunk_size, sites_format, names[0])
+    tasks = _tasks(sites, start_date, number_of_years, batch_days, names)
+
+    pa = _pyarrow()
+    import pyarrow.compute
+    import pyarrow.csv
+
+    rows = 0
+    writer = None
+    try:
+        for site_ids, dates, values in _results(tasks, columns, workers):
+            if writer is None:
+                schema = _schema(pa, columns, float32, pa.string())
+            table = _batch_table(pa, schema, values, dates, site_ids, columns, float32)
+            if output_format == "csv":
+                table = _csv_table(pa, table)
+            if writer is None:
+                if output_format == "csv":
+                    writer = pa.csv.CSVWriter(output_path, table.schema)
+                else:
+                    writer = pa.parquet.ParquetWriter(output_path, schema)
+            writer.write_table(table)
+            rows += len(site_ids) * len(dates)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="sunriset",
+        description="Write solar calculations for a CSV or Parquet file of sites.",
+    )
+    parser.add_argument("sites", help="CSV or Parquet file with id, lat, long, tz")
+    parser.add_argument("-o", "--output", required=True, help="CSV or Parquet file")
+    parser.add_argument(
+        "--start",
+        type=datetime.date.fromisoformat,
+        default=datetime.date(datetime.date.today().year, 1, 1),
+        help="first date, YYYY-MM-DD (default January 1st of this year)",
+    )
+    parser.add_argument("--years", type=int, default=1, help="number of years")
+    parser.add_argument(
+        "--columns", help="comma separated column names (default all)"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=1000, help="sites read and evaluated at once"
+    )
+    parser.add_argument(
+        "--batch-days", type=int, default=366, help="days evaluated at once"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="worker processes (0 for one per CPU)"
+    )
+    parser.add_argument(
+        "--float32",
+        action="store_true",
+        help="store floats as float32 (Julian Day and Century stay float64)",
+    )
+    parser.add_argument("--format", choices=FORMATS, help="output format")
+    parser.add_argument("--sites-format", choices=FORMATS, help="sites file format")
+    parser.add_argument(
+        "--names",
+        default="id,lat,long,tz",
+        help="the id, lat, long and tz column names of the sites file",
+    )
+    options = parser.parse_args(argv)
+
+    names = tuple(name.strip() for name in options.names.split(","))
+    if len(names) != 4:
+        parser.error("--names needs four column names")
+    columns = None
+    if options.columns:
+        columns = [name.strip() for name in options.columns.split(",")]
+    try:
+        rows = run(
+            options.sites,
+            options.output,
+            options.start,
+            options.years,
+            columns=columns,
+            chunk_size=options.chunk_size,
+            batch_days=options.batch_days,
+            workers=options.workers or os.cpu_count() or 1,
+            float32=options.float32,
+            names=names,
+            sites_format=options.sites_format,
+            output_format=options.format,
+        )
+    except (ImportError, OSError, ValueError) as error:
+        print("sunriset: error: {}".format(error), file=sys.stderr)
+        return 1
+    print("Wrote {} rows to {}".format(rows, options.output), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
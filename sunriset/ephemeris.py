@@ -0,0 +1,194 @@
+# This file is released under the MIT License OSI Approved.
+"""A shared, bounded cache of the date-only part of the calculation chain.
+
+Every column in pipeline.EPHEMERIS, julian_century through solar_decline,
+var_y and equation_of_time, depends only on the date and the time zone. The
+module level cache keeps those values for the most recently used dates (or
+date ranges) with least recently used eviction, so repeated queries for the
+same day only evaluate the site-specific columns.
+
+The cache is bounded both by entries, maxsize, and by the bytes of the values
+it holds, maxbytes: a day is 128 bytes, but a range is 128 bytes per day, 4.7
+MB for 100 years. Least recently used entries are evicted until both bounds
+hold, and a range larger than maxbytes on its own is returned without being
+cached.
+
+    >>> sunriset.ephemeris.cache_info()
+    CacheInfo(hits=0, misses=0, maxsize=1024, currsize=0)
+    >>> sunriset.ephemeris.set_cache_size(4096, maxbytes=256 * 2**20)
+"""
+
+import collections
+import threading
+
+import numpy as np
+
+from . import calc, table, vcalc
+from .pipeline import EPHEMERIS, ephemeris_inputs, evaluate
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+# The default bound on the bytes of the values the shared cache holds.
+MAXBYTES = 64 * 2**20
+_missing = object()
+
+
+def nbytes(value):
+    """Returns the bytes of the numbers in an entry: 8 per float and the nbytes
+    of each array of a dict, and 0 for anything else, such as a tuple."""
+    if not isinstance(value, dict):
+        return 0
+    return sum(getattr(item, "nbytes", 8) for item in value.values())
+
+
+class EphemerisCache:
+    """A thread safe LRU cache of EPHEMERIS values holding at most maxsize
+    entries and maxbytes bytes of values (see nbytes). A maxsize of 0 disables
+    caching."""
+
+    def __init__(self, maxsize=1024, maxbytes=MAXBYTES):
+        self._entries = collections.OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self.currbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute, *args):
+        """Returns the entry for key, calling compute(*args) to create it on a
+        miss."""
+        with self._lock:
+            value = self._entries.get(key, _missing)
+            if value is not _missing:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute(*args)
+        size = nbytes(value)
+        with self._lock:
+            if self._maxsize > 0 and size <= self._maxbytes and key not in self._sizes:
+                self._entries[key] = value
+                self._sizes[key] = size
+                self.currbytes += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        while len(self._entries) > self._maxsize or self.currbytes > self._maxbytes:
+            key, _ = self._entries.popitem(last=False)
+            self.currbytes -= self._sizes.pop(key)
+
+    def info(self):
+        """Returns the hits, misses, maxsize and current size as a CacheInfo."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self._maxsize, len(self._entries))
+
+    def clear(self):
+        """Empties the cache and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.currbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def resize(self, maxsize, maxbytes=None):
+        """Sets the number of entries, and with maxbytes the bytes of values, to
+        keep, evicting the oldest if needed."""
+        if maxsize < 0:
+            raise ValueError("maxsize must be 0 or more, not {!r}".format(maxsize))
+        if maxbytes is not None and maxbytes < 0:
+            raise ValueError("maxbytes must be 0 or more, not {!r}".format(maxbytes))
+        with self._lock:
+            self._maxsize = maxsize
+            if maxbytes is not None:
+                self._maxbytes = maxbytes
+            self._evict()
+
+
+_cache = EphemerisCache()
+
+
+def cache_info():
+    """Returns the shared ephemeris cache statistics as a CacheInfo."""
+    return _cache.info()
+
+
+def cache_clear():
+    """Empties the shared ephemeris cache and resets its statistics."""
+    _cache.clear()
+
+
+def cache_nbytes():
+    """Returns the bytes of values the shared ephemeris cache holds."""
+    return _cache.currbytes
+
+
+def set_cache_size(maxsize, maxbytes=None):
+    """Sets the number of dates (or date ranges) the shared cache keeps and,
+    with maxbytes, the bytes of values it may hold."""
+    _cache.resize(maxsize, maxbytes)
+
+
+def _day(date, local_tz):
+    values = evaluate(calc, EPHEMERIS, date=date, local_tz=local_tz)
+    return {name: values[name] for name in EPHEMERIS}
+
+
+def day(date, local_tz):
+    """Returns a dict of the EPHEMERIS values, as floats, for date, a
+    datetime.date, and the Time Zone, local_tz."""
+    return _cache.get(("day", date.toordinal(), local_tz), _day, date, local_tz)
+
+
+def at(julian_day, columns=("Solar Decline", "Equation Of Time Min")):
+    """Returns a dict of columns, any of table.TABLE_COLUMNS, at julian_day, a
+    float or an array of Julian Days, from the ephemeris table when one is in
+    use and covers them. These are instants, so they are not cached."""
+    ephemeris_table = table.active()
+    if ephemeris_table is not None:
+        values = ephemeris_table.values_at(julian_day)
+    else:
+        values = evaluate(vcalc, columns, known={"Julian Day": julian_day})
+    return {name: values[name] for name in columns}
+
+
+def days(dates, local_tz, columns=None, cache=True):
+    """Returns a dict of the EPHEMERIS values, as read-only arrays, for dates, a
+    DatetimeIndex, and the Time Zone, local_tz. Only ranges of consecutive days
+    are cached, keyed by their first day and length; others are computed.
+
+    When a table is in use (see sunriset.table) and columns, the columns the
+    caller will evaluate, only need values the table holds, just those values
+    are returned, interpolated from the table for the days it covers. With
+    cache false the shared cache is neither consulted nor filled, for one-off
+    ranges."""
+    ephemeris_table = table.active()
+    if ephemeris_table is not None and (
+        columns is None
+        or not set(ephemeris_inputs(columns)) <= set(table.TABLE_COLUMNS)
+    ):
+        ephemeris_table = None
+
+    def compute():
+        if ephemeris_table is None:
+            values = evaluate(vcalc, EPHEMERIS, date=dates, local_tz=local_tz)
+            values = {name: values[name] for name in EPHEMERIS}
+        else:
+            values = ephemeris_table.values_at(vcalc.julian_day(dates, local_tz))
+        for value in values.values():
+            value.setflags(write=False)
+        return values
+
+    day_numbers = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    if not cache or (np.diff(day_numbers) != 1).any():
+        return compute()
+    source = "days" if ephemeris_table is None else ephemeris_table.path
+    first = int(day_numbers[0]) if len(day_numbers) else 0
+    key = (source, first, len(day_numbers), float(local_tz))
+    return _cache.get(key, compute)
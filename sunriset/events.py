@@ -0,0 +1,104 @@
+# This file is released under the MIT License OSI Approved.
+"""The times the sun crosses any Zenith angle: twilight and custom elevations.
+
+calc.hour_angle_sunrise solves for the hour angle of a zenith, 90.833 degrees
+for the Sunrise and Sunset columns. crossings() solves a list of zeniths over
+a range of days in one pass. The closed form, from each day's Solar Decline
+and Solar Noon (float), is the first estimate and is exactly what the Sunrise
+and Sunset columns hold. Those values are for local noon though, and every
+iteration evaluates Solar Decline and Equation Of Time again at the estimated
+crossing and solves once more, until the times move less than TOLERANCE or
+after ITERATIONS iterations. That puts the sun within 1e-6 degrees of the
+zenith at the returned time; the closed form is up to 0.1 degrees out. A day
+whose crossing disappears at an estimate, the sun not reaching the zenith with
+the declination of that instant, has no crossing and stays NaN.
+
+    >>> sunriset.twilight(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8, 1)
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import ephemeris, vcalc
+from .pipeline import date_range
+
+# Zenith angles, in degrees, of the usual events.
+ZENITHS = {
+    "Sunrise": 90.833,
+    "Civil": 96.0,
+    "Nautical": 102.0,
+    "Astronomical": 108.0,
+}
+# The most iterations crossings() makes, and the change in days, about 0.1 ms,
+# below which it stops early.
+ITERATIONS = 10
+TOLERANCE = 1e-9
+EVENTS = ("Rising", "Setting")
+
+
+def crossings(dates, lat, long, local_tz, zeniths, iterations=ITERATIONS):
+    """Returns a dict of "Rising" and "Setting" (zenith x day) arrays of the
+    times, in days since local standard midnight like Sunrise (float), at which
+    the sun crosses each of zeniths. With dates, a DatetimeIndex of consecutive
+    days, Latitude, lat, Longitude, long and Time Zone, local_tz. Times are NaN
+    where the sun does not cross a zenith that day. iterations is the most
+    refinements to make; 0 returns the closed form."""
+    zeniths = np.asarray(zeniths, dtype=np.float64).reshape(-1, 1)
+    daily = ephemeris.days(dates, local_tz, ["Sunrise (float)", "Sunset (float)"])
+    declination = daily["Solar Decline"]
+    equation_of_time = daily["Equation Of Time Min"]
+    # Rising and Setting along the first axis, (event x zenith x day).
+    sign = np.array([-1.0, 1.0]).reshape(2, 1, 1)
+    local_noon = vcalc.julian_day(dates, local_tz)
+
+    times = None
+    for iteration in range(iterations + 1):
+        with np.errstate(invalid="ignore"):
+            hour_angle = vcalc.hour_angle_sunrise(lat, declination, zeniths)
+        estimate = (
+            vcalc.solar_noon_float(equation_of_time, long, local_tz)
+            + sign * hour_angle / 360
+        )
+        if times is not None:
+            # A day without a crossing at an estimate has none: it stays NaN.
+            estimate[np.isnan(times)] = np.nan
+            converged = not (np.abs(estimate - times) > TOLERANCE).any()
+        times = estimate
+        if iteration == iterations or (iteration and converged):
+            break
+        # Days without a crossing keep NaN; evaluate those at noon.
+        at = ephemeris.at(local_noon - 0.5 + np.where(np.isnan(times), 0.5, times))
+        declination = at["Solar Decline"]
+        equation_of_time = at["Equation Of Time Min"]
+    return dict(zip(EVENTS, times))
+
+
+def twilight(
+    start_date,
+    lat,
+    long,
+    local_tz,
+    number_of_years,
+    zeniths=None,
+    iterations=ITERATIONS,
+):
+    """Returns a Pandas DataFrame, indexed by date, of the times the sun
+    crosses zeniths, as timedeltas in local standard time like the Sunrise
+    column. With a datetime.date for starting date, Latitude, lat, Longitude,
+    long and Time Zone, local_tz.
+
+    zeniths is a dict of names and Zenith angles, ZENITHS by default, or a list
+    of angles, which are named by their value. Each gets a "<name> Rising" and
+    a "<name> Setting" column."""
+    if zeniths is None:
+        zeniths = ZENITHS
+    if not isinstance(zeniths, dict):
+        zeniths = {"{:g}".format(zenith): zenith for zenith in zeniths}
+    dates = date_range(start_date, number_of_years)
+    times = crossings(dates, lat, long, local_tz, list(zeniths.values()), iterations)
+    frame = {}
+    for i, name in enumerate(zeniths):
+        for event in EVENTS:
+            column = "{} {}".format(name, event)
+            frame[column] = vcalc.make_time(times[event][i], None, 0)
+    return pd.DataFrame(frame, index=dates)
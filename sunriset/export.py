@@ -0,0 +1,166 @@
+# This file is released under the MIT License OSI Approved.
+"""Writing the solar tables to Parquet or Arrow IPC files, a chunk at a time.
+
+The tables are evaluated in batches of days, as in sunriset.stream, and each
+batch is written as soon as it is computed, with typed columns: float64 (or
+float32) values, duration[ns] Solar Noon, Sunrise and Sunset, and a
+timestamp[ns] Date. Julian Day and Julian Century stay float64 with float32,
+whose spacing near 2.46e6 is a quarter of a day. With partition_by the output is a directory of
+site=<id>/year=<year>/part-0.<ext> files that Arrow datasets read directly.
+
+These need pyarrow, which is installed with ``pip install sunriset[arrow]``.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import COLUMNS, date_batches
+from .sites import evaluate_sites, site_arrays
+from .stream import column_dtype
+
+FORMATS = ("parquet", "arrow")
+PARTITIONS = ("site", "year")
+# The float columns float32 does not apply to, as float32 cannot hold them.
+FLOAT64_COLUMNS = ("Julian Day", "Julian Century")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "Writing Parquet or Arrow files needs pyarrow: "
+            "pip install sunriset[arrow]"
+        ) from None
+    return pyarrow
+
+
+def _schema(pa, columns, float32, site_type):
+    fields = [] if site_type is None else [pa.field("Site", site_type)]
+    fields.append(pa.field("Date", pa.timestamp("ns")))
+    for name in columns:
+        if column_dtype(name).kind == "m":
+            fields.append(pa.field(name, pa.duration("ns")))
+        elif column_dtype(name).kind == "U":
+            fields.append(pa.field(name, pa.string()))
+        elif float32 and name not in FLOAT64_COLUMNS:
+            fields.append(pa.field(name, pa.float32()))
+        else:
+            fields.append(pa.field(name, pa.float64()))
+    return pa.schema(fields)
+
+
+def _batch_table(pa, schema, values, dates, site_ids, columns, float32):
+    """Returns a pyarrow Table of schema from values, the (site x day) arrays
+    of one batch."""
+    arrays = {}
+    if "Site" in schema.names:
+        arrays["Site"] = np.repeat(site_ids, len(dates))
+        if schema.field("Site").type == pa.string():
+            arrays["Site"] = arrays["Site"].astype(str)
+    arrays["Date"] = np.tile(dates.values, len(site_ids))
+    for name in columns:
+        arrays[name] = values[name].ravel()
+        if float32 and name not in FLOAT64_COLUMNS and arrays[name].dtype.kind == "f":
+            arrays[name] = arrays[name].astype(np.float32)
+    return pa.Table.from_pydict(arrays, schema=schema)
+
+
+def _writer(pa, path, schema, format):
+    if format == "parquet":
+        return pa.parquet.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+
+def write_table(
+    path,
+    start_date,
+    lat,
+    long,
+    local_tz,
+    number_of_years,
+    columns=None,
+    format="parquet",
+    batch_days=366,
+    float32=False,
+    partition_by=(),
+    site_ids=None,
+):
+    """Writes the solar calculations to path, a Parquet or Arrow IPC ("arrow")
+    file, batch_days days at a time. With a datetime.date for starting date,
+    Latitude, lat, Longitude, long and Time Zone, local_tz, either scalars for
+    one site or arrays for many, when rows also get a Site column of site_ids
+    (numbered from 0 by default).
+
+    float32 stores the float columns but FLOAT64_COLUMNS as float32.
+    partition_by, any of "site" and "year", makes path a directory with one
+    file per partition instead."""
+    if format not in FORMATS:
+        raise ValueError(
+            "format must be 'parquet' or 'arrow', not {!r}".format(format)
+        )
+    unknown = set(partition_by) - set(PARTITIONS)
+    if unknown:
+        raise ValueError("Unknown partitions: {}".format(", ".join(sorted(unknown))))
+    pa = _pyarrow()
+    columns = COLUMNS if columns is None else list(columns)
+    sites = any(np.ndim(value) > 0 for value in (lat, long, local_tz))
+    lat, long, local_tz = site_arrays(lat, long, local_tz)
+    site_ids = np.arange(len(lat)) if site_ids is None else np.asarray(site_ids)
+    by_site = "site" in partition_by
+    by_year = "year" in partition_by
+
+    site_type = None
+    if sites and not by_site:
+        numeric = site_ids.dtype.kind in "iu"
+        site_type = pa.from_numpy_dtype(site_ids.dtype) if numeric else pa.string()
+    schema = _schema(pa, columns, float32, site_type)
+    site_groups = [[i] for i in range(len(lat))] if by_site else [slice(None)]
+
+    writer = writer_path = None
+    try:
+        for rows in site_groups:
+            for dates in date_batches(
+                start_date, number_of_years, batch_days, by_year
+            ):
+                values = evaluate_sites(
+                    dates, lat[rows], long[rows], local_tz[rows], columns, cache=False
+                )
+                table = _batch_table(
+                    pa, schema, values, dates, site_ids[rows], columns, float32
+                )
+                target = path
+                if partition_by:
+                    parts = []
+                    if by_site:
+                        parts.append("site={}".format(site_ids[rows][0]))
+                    if by_year:
+                        parts.append("year={}".format(dates[0].year))
+                    target = os.path.join(path, *parts, "part-0." + format)
+                if target != writer_path:
+                    if writer is not None:
+                        writer.close()
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    writer, writer_path = _writer(pa, target, schema, format), target
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def to_parquet(path, start_date, lat, long, local_tz, number_of_years, **options):
+    """Writes the solar calculations to a Parquet file (or partitioned directory)
+    at path. See write_table for the arguments and options."""
+    options["format"] = "parquet"
+    write_table(path, start_date, lat, long, local_tz, number_of_years, **options)
+
+
+def to_arrow(path, start_date, lat, long, local_tz, number_of_years, **options):
+    """Writes the solar calculations to an Arrow IPC file (or partitioned
+    directory) at path. See write_table for the arguments and options."""
+    options["format"] = "arrow"
+    write_table(path, start_date, lat, long, local_tz, number_of_years, **options)
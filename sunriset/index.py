@@ -0,0 +1,203 @@
+# This file is released under the MIT License OSI Approved.
+"""An index of Sunrise, Solar Noon and Sunset instants for one site.
+
+EventIndex evaluates a span of days in bulk, as sites.evaluate_sites does,
+and keeps every event as a sorted array of UTC nanoseconds. "What is the next
+sunset after t", "what was the last event before t" and "is it daylight at t"
+are then binary searches (np.searchsorted) rather than calculations, for one
+instant or an array of them. Queries outside the span extend it, a chunk of
+days at a time, in either direction.
+
+Days without a sunrise or sunset (polar day and night) only have a Solar
+Noon. It is daylight at t when the last sunrise or sunset before t was a
+sunrise, or when t is on a polar day.
+
+    >>> index = sunriset.EventIndex(34.0522, -118.2437, -8)
+    >>> index.next(datetime.datetime.now(datetime.timezone.utc), "Sunset")
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .records import _utc_nanoseconds
+from .sites import evaluate_sites
+from .timeseries import NANOSECONDS_PER_DAY
+
+# The events, in the order they occur each day, and their float columns.
+EVENTS = ("Sunrise", "Solar Noon", "Sunset")
+EVENT_COLUMNS = ("Sunrise (float)", "Solar Noon (float)", "Sunset (float)")
+# Codes of the local midnights that start a polar day or a polar night, which
+# is_daylight uses alongside Sunrise and Sunset.
+POLAR_DAY, POLAR_NIGHT = len(EVENTS), len(EVENTS) + 1
+# Whether the sun is up after each code: Sunrise, Solar Noon, Sunset and polar.
+DAYLIGHT = np.array([True, True, False, True, False])
+# How far next and previous look for an event before giving up, in days.
+SEARCH_DAYS = 366
+
+
+class EventIndex:
+    """The Sunrise, Solar Noon and Sunset instants of the site at Latitude, lat,
+    Longitude, long and Time Zone, local_tz, for days days from start_date (by
+    default yesterday, UTC). It grows by chunk_days days (days by default)
+    whenever a query needs it."""
+
+    def __init__(
+        self, lat, long, local_tz, start_date=None, days=366, chunk_days=None
+    ):
+        if start_date is None:
+            start_date = datetime.datetime.now(datetime.timezone.utc).date()
+            start_date -= datetime.timedelta(days=1)
+        self.lat = lat
+        self.long = long
+        self.local_tz = local_tz
+        self.chunk_days = chunk_days or days
+        self.first_date = self.last_date = start_date
+        self._times = np.empty(0, dtype=np.int64)
+        self._events = np.empty(0, dtype=np.int8)
+        # Positions of each selection of events, until the index next grows.
+        self._positions = {}
+        self._extend(days)
+
+    def __len__(self):
+        return len(self._times)
+
+    def _midnight(self, date):
+        """Returns local standard midnight of date in UTC nanoseconds."""
+        ordinal = date.toordinal() - datetime.date(1970, 1, 1).toordinal()
+        return ordinal * NANOSECONDS_PER_DAY - int(self.local_tz * 3600 * 10**9)
+
+    def _evaluate(self, start_date, days):
+        dates = pd.date_range(start_date, periods=days, freq="D")
+        columns = EVENT_COLUMNS + ("Solar Decline",)
+        with np.errstate(invalid="ignore"):
+            values = evaluate_sites(
+                dates, self.lat, self.long, self.local_tz, columns, cache=False
+            )
+        midnights = dates.as_unit("ns").asi8 - int(self.local_tz * 3600 * 10**9)
+        # (day x event), flattened to the order the events happen in.
+        times = np.stack([values[name][0] for name in EVENT_COLUMNS], axis=1)
+        times = midnights[:, np.newaxis] + np.rint(times * NANOSECONDS_PER_DAY)
+        events = np.broadcast_to(np.arange(len(EVENTS), dtype=np.int8), times.shape)
+        valid = np.isfinite(times).ravel()
+
+        # Days without a sunrise are polar days if the sun is up at noon.
+        polar = np.flatnonzero(np.isnan(times[:, 0]))
+        noon_zenith = np.abs(self.lat - values["Solar Decline"][0][polar])
+        polar_events = np.where(noon_zenith < 90.833, POLAR_DAY, POLAR_NIGHT)
+        times = np.concatenate([times.ravel()[valid], midnights[polar]])
+        events = np.concatenate([events.ravel()[valid], polar_events.astype(np.int8)])
+        order = np.argsort(times, kind="stable")
+        return times[order].astype(np.int64), events[order]
+
+    def _extend(self, days):
+        """Adds days days after the end of the index, or before its start when
+        days is negative."""
+        self._positions.clear()
+        if days > 0:
+            times, events = self._evaluate(self.last_date, days)
+            self._times = np.concatenate([self._times, times])
+            self._events = np.concatenate([self._events, events])
+            self.last_date += datetime.timedelta(days=days)
+        elif days < 0:
+            self.first_date -= datetime.timedelta(days=-days)
+            times, events = self._evaluate(self.first_date, -days)
+            self._times = np.concatenate([times, self._times])
+            self._events = np.concatenate([events, self._events])
+        # The UTC instants, in nanoseconds, where the index begins and ends.
+        self.start = self._midnight(self.first_date)
+        self.end = self._midnight(self.last_date)
+
+    def _search(self, t, events, forward):
+        """Returns the position in the index of the first of events after each
+        instant of t (forward) or the last at or before it, with -1 where there
+        is none within SEARCH_DAYS days or t is NaT."""
+        if np.ndim(t) == 0:
+            nanoseconds = np.array([pd.Timestamp(t).value])
+        else:
+            nanoseconds = _utc_nanoseconds(t)
+        # NaT is int64 min: it has no event and must not extend the index.
+        valid = nanoseconds != pd.NaT.value
+        found = np.full(len(nanoseconds), -1, dtype=np.intp)
+        if valid.any():
+            found[valid] = self._find(nanoseconds[valid], events, forward)
+        return found
+
+    def _find(self, nanoseconds, events, forward):
+        """Returns _search() for nanoseconds, UTC instants that are not NaT."""
+        while nanoseconds.min() < self.start:
+            self._extend(-self.chunk_days)
+        while nanoseconds.max() >= self.end:
+            self._extend(self.chunk_days)
+
+        search = SEARCH_DAYS * NANOSECONDS_PER_DAY
+        codes = tuple(events)
+        while True:
+            if codes not in self._positions:
+                positions = np.flatnonzero(np.isin(self._events, codes))
+                self._positions[codes] = positions, self._times[positions]
+            positions, times = self._positions[codes]
+            i = np.searchsorted(times, nanoseconds, side="right")
+            if not forward:
+                i -= 1
+            missing = (i == len(positions)) | (i < 0)
+            if not missing.any():
+                break
+            if forward and self.end < nanoseconds.max() + search:
+                self._extend(self.chunk_days)
+            elif not forward and self.start > nanoseconds.min() - search:
+                self._extend(-self.chunk_days)
+            else:
+                break
+        if len(positions) == 0:
+            return np.full(len(nanoseconds), -1, dtype=np.intp)
+        return np.where(missing, -1, positions[np.minimum(i, len(positions) - 1)])
+
+    def _events_at(self, t, event, forward):
+        if event is None:
+            events = EVENTS
+        elif event in EVENTS:
+            events = (event,)
+        else:
+            raise ValueError(
+                "event must be one of {}, not {!r}".format(", ".join(EVENTS), event)
+            )
+        found = self._search(t, [EVENTS.index(event) for event in events], forward)
+        if np.ndim(t) == 0:
+            if found[0] < 0:
+                return pd.NaT, None
+            return (
+                pd.Timestamp(int(self._times[found[0]]), tz="UTC"),
+                EVENTS[self._events[found[0]]],
+            )
+        times = np.where(found >= 0, self._times[found], np.iinfo(np.int64).min)
+        names = np.array(EVENTS, dtype=object)[self._events[found] % len(EVENTS)]
+        names[found < 0] = None
+        return pd.DatetimeIndex(times.view("M8[ns]"), tz="UTC"), names
+
+    def next(self, t, event=None):
+        """Returns the first event after t, a datetime (naive ones are UTC) or
+        an array of them, as a tuple of its UTC Timestamp and name. With event,
+        one of EVENTS, the first event of that kind. The Timestamp is NaT and the
+        name None where there is none within SEARCH_DAYS days, or t is NaT."""
+        return self._events_at(t, event, forward=True)
+
+    def previous(self, t, event=None):
+        """Returns the last event at or before t, a datetime (naive ones are UTC)
+        or an array of them, as a tuple of its UTC Timestamp and name. With event,
+        one of EVENTS, the last event of that kind. The Timestamp is NaT and the
+        name None where there is none within SEARCH_DAYS days, or t is NaT."""
+        return self._events_at(t, event, forward=False)
+
+    def is_daylight(self, t):
+        """Returns True where the sun is up at t, a datetime (naive ones are UTC)
+        or an array of them: where the last sunrise or sunset was a sunrise, or
+        on polar days. It is False where t is NaT."""
+        sunrise, sunset = EVENTS.index("Sunrise"), EVENTS.index("Sunset")
+        codes = (sunrise, sunset, POLAR_DAY, POLAR_NIGHT)
+        found = self._search(t, codes, forward=False)
+        daylight = (found >= 0) & DAYLIGHT[self._events[found]]
+        if np.ndim(t) == 0:
+            return bool(daylight[0])
+        return daylight
@@ -0,0 +1,187 @@
+# This file is released under the MIT License OSI Approved.
+"""Daily and monthly solar energy on a horizontal surface.
+
+Two integrals over the hours of daylight, in Wh/m2 per day:
+
+Extraterrestrial Insolation, above the atmosphere, has a closed form in the
+sunset hour angle ws, the Solar Radius Vector r, Latitude and Solar Decline:
+
+    24 / pi * SOLAR_CONSTANT / r**2 * (cos(lat) cos(dec) sin(ws)
+                                       + ws sin(lat) sin(dec))
+
+Clear Sky Insolation, at the ground, integrates the Haurwitz model of clear
+sky global horizontal irradiance, 1098 cos(z) exp(-0.059 / cos(z)) W/m2 for
+the Solar Zenith Angle z, over the day with NODES point Gauss-Legendre
+quadrature in the hour angle; with 8 nodes it is within 0.02% of the exact
+integral. The cosine of the zenith angle is that of vcalc.solar_zenith_angle,
+computed directly to save an arccos and a cos per node.
+
+Neither depends on Longitude. The days are evaluated in batches, so the
+working memory of the integrals depends on the number of sites rather than the
+number of years. daily_insolation still returns 8 bytes (4 with float32) per
+site and day for each column; monthly_insolation holds one year of daily values
+at a time. With dtype np.float32 the quadrature runs about three times faster;
+25 years for 10,000 sites then takes a few seconds:
+
+    >>> months, values = sunriset.insolation.monthly_insolation(
+    ...     datetime.date(2000, 1, 1), lat, local_tz, 25, dtype=np.float32)
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import ephemeris, vcalc
+from .pipeline import date_batches
+from .sites import site_arrays
+
+# The total solar irradiance at 1 AU, in W/m2.
+SOLAR_CONSTANT = 1361.0
+# Quadrature points per half day for the clear sky integral.
+NODES = 8
+EXTRATERRESTRIAL = "Extraterrestrial Insolation (Wh/m2)"
+CLEAR_SKY = "Clear Sky Insolation (Wh/m2)"
+INSOLATION_COLUMNS = (EXTRATERRESTRIAL, CLEAR_SKY)
+# The ephemeris columns the integrals use.
+EPHEMERIS_COLUMNS = ["Solar Decline", "Solar Radius Vector AUs"]
+
+
+def _geometry(lat, solar_decline, dtype):
+    """Returns sin(lat) sin(dec) and cos(lat) cos(dec), so that cos(z) is the
+    first plus the second times cos(hour angle), and the sunset hour angle, in
+    radians, as dtype arrays."""
+    lat, solar_decline = np.radians(lat), np.radians(solar_decline)
+    constant = np.sin(lat).astype(dtype) * np.sin(solar_decline).astype(dtype)
+    amplitude = np.cos(lat).astype(dtype) * np.cos(solar_decline).astype(dtype)
+    # Clipping gives 0 on a polar night and pi on a polar day.
+    angle = np.arccos(np.clip(-constant / amplitude, -1, 1))
+    return constant, amplitude, angle
+
+
+def sunset_hour_angle(lat, solar_decline):
+    """Returns the Hour Angle, in degrees, at which the centre of the sun sets
+    below the geometric horizon (vcalc.hour_angle_sunrise with a zenith of 90)
+    with Latitude, lat and Solar Decline Deg, solar_decline: 180 on a polar day
+    and 0 on a polar night."""
+    return np.degrees(_geometry(lat, solar_decline, np.float64)[2])
+
+
+def _extraterrestrial(constant, amplitude, angle, solar_radius_vector):
+    scale = 24 / np.pi * SOLAR_CONSTANT / solar_radius_vector**2
+    return (amplitude * np.sin(angle) + angle * constant) * scale.astype(angle.dtype)
+
+
+def extraterrestrial(lat, solar_decline, solar_radius_vector, dtype=np.float64):
+    """Returns the daily insolation, in Wh/m2, on a horizontal surface above the
+    atmosphere with Latitude, lat, Solar Decline Deg, solar_decline and Solar
+    Radius Vector AUs, solar_radius_vector, as a dtype array."""
+    return _extraterrestrial(
+        *_geometry(lat, solar_decline, dtype), np.asarray(solar_radius_vector)
+    )
+
+
+def _clear_sky(constant, amplitude, angle, nodes):
+    dtype = angle.dtype
+    # Hours of daylight: sunlight_duration is in minutes.
+    hours = vcalc.sunlight_duration(np.degrees(angle)) / dtype.type(60)
+    points, weights = np.polynomial.legendre.leggauss(nodes)
+    total = np.zeros(angle.shape, dtype=dtype)
+    cos_zenith = np.empty_like(total)
+    irradiance = np.empty_like(total)
+    for point, weight in zip((points + 1) / 2, weights / 2):
+        np.multiply(angle, dtype.type(point), out=cos_zenith)
+        np.cos(cos_zenith, out=cos_zenith)
+        cos_zenith *= amplitude
+        cos_zenith += constant
+        # The sun is above the horizon at every node; this only guards rounding.
+        np.maximum(cos_zenith, dtype.type(1e-9), out=cos_zenith)
+        np.divide(dtype.type(-0.059), cos_zenith, out=irradiance)
+        np.exp(irradiance, out=irradiance)
+        irradiance *= cos_zenith
+        irradiance *= dtype.type(1098 * weight)
+        total += irradiance
+    total *= hours
+    return total
+
+
+def clear_sky(lat, solar_decline, nodes=NODES, dtype=np.float64):
+    """Returns the daily clear sky insolation, in Wh/m2, on a horizontal surface
+    with Latitude, lat and Solar Decline Deg, solar_decline, as a dtype array."""
+    return _clear_sky(*_geometry(lat, solar_decline, dtype), nodes)
+
+
+def _evaluate(dates, lat, local_tz, columns, dtype, cache):
+    """Returns a dict of columns to (site x day) dtype arrays for dates."""
+    result = {name: np.empty((len(lat), len(dates)), dtype=dtype) for name in columns}
+    for tz in np.unique(local_tz):
+        rows = np.flatnonzero(local_tz == tz)
+        known = ephemeris.days(dates, tz, EPHEMERIS_COLUMNS, cache)
+        geometry = _geometry(lat[rows, np.newaxis], known["Solar Decline"], dtype)
+        if EXTRATERRESTRIAL in columns:
+            result[EXTRATERRESTRIAL][rows] = _extraterrestrial(
+                *geometry, known["Solar Radius Vector AUs"]
+            )
+        if CLEAR_SKY in columns:
+            result[CLEAR_SKY][rows] = _clear_sky(*geometry, NODES)
+    return result
+
+
+def _columns(columns):
+    columns = list(INSOLATION_COLUMNS if columns is None else columns)
+    unknown = set(columns) - set(INSOLATION_COLUMNS)
+    if unknown:
+        raise ValueError("Unknown columns: {}".format(", ".join(sorted(unknown))))
+    return columns
+
+
+def daily_insolation(
+    start_date,
+    lat,
+    local_tz,
+    number_of_years,
+    columns=None,
+    dtype=np.float64,
+    batch_days=366,
+):
+    """Returns a tuple of the daily DatetimeIndex and a dict of column name, any
+    of INSOLATION_COLUMNS, to a 2-D (site x day) array of Wh/m2. With a
+    datetime.date for starting date and arrays (or scalars) of Latitude, lat
+    and Time Zone, local_tz, one per site. The days are evaluated batch_days
+    at a time into the result, which holds them all: use monthly_insolation
+    for long ranges of many sites."""
+    columns = _columns(columns)
+    lat, _, local_tz = site_arrays(lat, 0, local_tz)
+    batches = list(date_batches(start_date, number_of_years, batch_days, False))
+    dates = batches[0].append(batches[1:]) if batches else pd.DatetimeIndex([])
+    result = {name: np.empty((len(lat), len(dates)), dtype=dtype) for name in columns}
+    begin = 0
+    for batch in batches:
+        values = _evaluate(batch, lat, local_tz, columns, dtype, cache=False)
+        for name in columns:
+            result[name][:, begin : begin + len(batch)] = values[name]
+        begin += len(batch)
+    return dates, result
+
+
+def monthly_insolation(
+    start_date, lat, local_tz, number_of_years, columns=None, dtype=np.float64
+):
+    """Returns a tuple of a DatetimeIndex of the first day of each month and a
+    dict of column name, any of INSOLATION_COLUMNS, to a 2-D (site x month)
+    array of the Wh/m2 summed over the days of each month in the range, as
+    daily_insolation. Only one year of daily values is held at a time."""
+    columns = _columns(columns)
+    lat, _, local_tz = site_arrays(lat, 0, local_tz)
+    sums = {name: [] for name in columns}
+    months = []
+    # Yearly batches, so no month is split between two of them.
+    for batch in date_batches(start_date, number_of_years, 366, True):
+        values = _evaluate(batch, lat, local_tz, columns, dtype, cache=False)
+        starts = np.flatnonzero(np.r_[True, batch.month[1:] != batch.month[:-1]])
+        months.append(batch[starts])
+        for name in columns:
+            sums[name].append(np.add.reduceat(values[name], starts, axis=1))
+    if not months:
+        empty = np.empty((len(lat), 0), dtype=dtype)
+        return pd.DatetimeIndex([]), {name: empty.copy() for name in columns}
+    index = months[0].append(months[1:]).to_period("M").to_timestamp().as_unit("ns")
+    return index, {name: np.concatenate(sums[name], axis=1) for name in columns}
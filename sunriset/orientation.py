@@ -0,0 +1,175 @@
+# This file is released under the MIT License OSI Approved.
+"""Angle of incidence and exposure of tilted planes, for panel placement.
+
+A plane with tilt b from horizontal, facing azimuth g (degrees cw from North,
+like solar_azimuth), has the unit normal (cos b, sin b cos g, sin b sin g) in
+(up, north, east) coordinates, and the sun at Solar Zenith Angle z and Solar
+Azimuth a is at (cos z, sin z cos a, sin z sin a). The cosine of the angle of
+incidence is their dot product, so every (orientation x sun position) pair is
+one (orientation x 3) @ (3 x time) matrix product rather than nested loops.
+
+Exposure is the sum over the sun positions above the horizon of
+max(cos(incidence), 0) times a weight per position, such as the time step in
+hours or an irradiance. exposure() and best_orientation() evaluate the
+(orientation x time) matrix max_bytes at a time, so the full matrix is never
+held for long sun paths. sweep() finds the best orientation for many sites:
+
+    >>> sunriset.orientation.sweep(datetime.date(2019, 1, 1), lat, long,
+    ...                            local_tz, 1, freq="10min")
+"""
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import date_range
+from .sites import site_arrays
+from .timeseries import AZIMUTH, NANOSECONDS_PER_DAY, sun_path, time_offsets
+
+# The default candidate orientations, in degrees.
+TILTS = np.arange(0, 91, 5)
+AZIMUTHS = np.arange(0, 360, 10)
+# The largest (orientation x time) block of cosines evaluated at once, in bytes.
+MAX_BYTES = 64 * 2**20
+ZENITH = "Solar Zenith Angle (degrees)"
+# The columns of sweep().
+TILT = "Tilt (degrees)"
+PLANE_AZIMUTH = "Azimuth (degrees cw from North)"
+EXPOSURE = "Exposure (hours)"
+
+
+def grid(tilts=TILTS, azimuths=AZIMUTHS):
+    """Returns the tilt and azimuth of every combination of tilts and azimuths,
+    as two 1-D arrays, tilt major."""
+    tilt, azimuth = np.meshgrid(
+        np.asarray(tilts, dtype=np.float64),
+        np.asarray(azimuths, dtype=np.float64),
+        indexing="ij",
+    )
+    return tilt.ravel(), azimuth.ravel()
+
+
+def _vectors(polar, azimuth):
+    """Returns the (n x 3) unit (up, north, east) vectors at polar angle polar
+    from vertical and azimuth, in degrees cw from North."""
+    polar = np.radians(np.asarray(polar, dtype=np.float64)).ravel()
+    azimuth = np.radians(np.asarray(azimuth, dtype=np.float64)).ravel()
+    return np.stack(
+        [
+            np.cos(polar),
+            np.sin(polar) * np.cos(azimuth),
+            np.sin(polar) * np.sin(azimuth),
+        ],
+        axis=1,
+    )
+
+
+def cos_incidence(tilt, azimuth, zenith, sun_azimuth):
+    """Returns the (orientation x time) cosines of the angle of incidence for
+    planes of tilt and azimuth, 1-D arrays in degrees, and sun positions of
+    Solar Zenith Angle, zenith and Solar Azimuth, sun_azimuth, in degrees."""
+    return _vectors(tilt, azimuth) @ _vectors(zenith, sun_azimuth).T
+
+
+def incidence(tilt, azimuth, zenith, sun_azimuth):
+    """Returns the (orientation x time) angle of incidence, in degrees, as
+    cos_incidence."""
+    cosine = cos_incidence(tilt, azimuth, zenith, sun_azimuth)
+    return np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+
+
+def _daylight(zenith, sun_azimuth, weights):
+    """Returns the zenith, azimuth and weights of the sun positions above the
+    horizon, as 1-D arrays."""
+    zenith = np.asarray(zenith, dtype=np.float64).ravel()
+    sun_azimuth = np.asarray(sun_azimuth, dtype=np.float64).ravel()
+    if weights is None:
+        weights = np.ones_like(zenith)
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), zenith.shape)
+    up = zenith < 90
+    return zenith[up], sun_azimuth[up], weights.ravel()[up]
+
+
+def exposure(tilt, azimuth, zenith, sun_azimuth, weights=None, max_bytes=MAX_BYTES):
+    """Returns the exposure of each plane of tilt and azimuth, 1-D arrays in
+    degrees: the sum of max(cos(incidence), 0) times weights (1 by default)
+    over the sun positions of Solar Zenith Angle, zenith and Solar Azimuth,
+    sun_azimuth, that are above the horizon. At most max_bytes of cosines are
+    held at once."""
+    zenith, sun_azimuth, weights = _daylight(zenith, sun_azimuth, weights)
+    normals = _vectors(tilt, azimuth)
+    sun = _vectors(zenith, sun_azimuth)
+    chunk = max(1, max_bytes // (8 * len(normals)))
+    total = np.zeros(len(normals))
+    for begin in range(0, len(sun), chunk):
+        cosine = normals @ sun[begin : begin + chunk].T
+        np.maximum(cosine, 0, out=cosine)
+        total += cosine @ weights[begin : begin + chunk]
+    return total
+
+
+def best_orientation(
+    tilt, azimuth, zenith, sun_azimuth, weights=None, max_bytes=MAX_BYTES
+):
+    """Returns the tilt, azimuth and exposure of the candidate plane, one of
+    tilt and azimuth, with the most exposure for each site. zenith, sun_azimuth
+    and weights are (site x time) arrays, or 1-D for one site, as exposure."""
+    zenith = np.atleast_2d(zenith)
+    sun_azimuth = np.broadcast_to(np.atleast_2d(sun_azimuth), zenith.shape)
+    if weights is not None:
+        weights = np.broadcast_to(np.atleast_2d(weights), zenith.shape)
+    tilt = np.asarray(tilt, dtype=np.float64).ravel()
+    azimuth = np.asarray(azimuth, dtype=np.float64).ravel()
+    best = np.empty(len(zenith), dtype=np.intp)
+    most = np.empty(len(zenith))
+    for site in range(len(zenith)):
+        totals = exposure(
+            tilt,
+            azimuth,
+            zenith[site],
+            sun_azimuth[site],
+            None if weights is None else weights[site],
+            max_bytes,
+        )
+        best[site] = np.argmax(totals)
+        most[site] = totals[best[site]]
+    return tilt[best], azimuth[best], most
+
+
+def sweep(
+    start_date,
+    lat,
+    long,
+    local_tz,
+    number_of_years,
+    tilts=TILTS,
+    azimuths=AZIMUTHS,
+    freq="10min",
+    max_bytes=MAX_BYTES,
+):
+    """Returns a Pandas DataFrame of the best Tilt, Azimuth and Exposure (hours
+    of sun, weighted by the cosine of the angle of incidence) for each site of
+    the grid of tilts and azimuths, in degrees. With a datetime.date for
+    starting date, arrays (or scalars) of Latitude, lat, Longitude, long and
+    Time Zone, local_tz, one per site, and the sun path sampled every freq."""
+    lat, long, local_tz = site_arrays(lat, long, local_tz)
+    dates = date_range(start_date, number_of_years)
+    time_of_day = time_offsets(freq) / NANOSECONDS_PER_DAY
+    hours = pd.Timedelta(freq).total_seconds() / 3600
+    tilt, azimuth = grid(tilts, azimuths)
+
+    best = {TILT: np.empty(len(lat)), PLANE_AZIMUTH: np.empty(len(lat))}
+    best[EXPOSURE] = np.empty(len(lat))
+    # One site's sun path at a time.
+    for site in range(len(lat)):
+        path = sun_path(dates, lat[site], long[site], local_tz[site], time_of_day)
+        result = best_orientation(
+            tilt,
+            azimuth,
+            path[ZENITH].ravel(),
+            path[AZIMUTH].ravel(),
+            hours,
+            max_bytes,
+        )
+        for name, value in zip(best, result):
+            best[name][site] = value[0]
+    return pd.DataFrame(best)
@@ -0,0 +1,106 @@
+# This file is released under the MIT License OSI Approved.
+"""Process pool execution of sites.evaluate_sites.
+
+The (site x day) result of every column is preallocated in a single
+multiprocessing.shared_memory block. Sites, and for short site lists also
+dates, are split into tasks for a concurrent.futures.ProcessPoolExecutor and
+each worker writes its block of rows and days straight into the shared
+arrays, so nothing but the small task description is pickled. The parent
+copies the block out once all tasks are done and releases it.
+"""
+
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .sites import evaluate_sites, site_arrays
+
+# Tasks per worker, so that uneven tasks still keep every worker busy.
+TASKS_PER_WORKER = 4
+
+
+def _layout(dtypes, shape):
+    """Returns the byte offset of each column and the total size of the block."""
+    offsets = {}
+    size = 0
+    for name, dtype in dtypes.items():
+        # Start each column on 8 bytes, as string columns may end off it.
+        size += -size % 8
+        offsets[name] = size
+        size += dtype.itemsize * shape[0] * shape[1]
+    return offsets, max(size, 1)
+
+
+def _views(buffer, dtypes, shape, offsets):
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offsets[name])
+        for name, dtype in dtypes.items()
+    }
+
+
+def _split(length, parts):
+    bounds = np.linspace(0, length, min(parts, length) + 1).astype(int)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _worker(shm_name, dtypes, shape, offsets, rows, days, dates, lat, long, local_tz):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        views = _views(shm.buf, dtypes, shape, offsets)
+        values = evaluate_sites(dates, lat, long, local_tz, list(dtypes))
+        for name, view in views.items():
+            view[rows[0] : rows[1], days[0] : days[1]] = values[name]
+        del views, values
+    finally:
+        shm.close()
+    return rows, days
+
+
+def evaluate_sites_parallel(dates, lat, long, local_tz, columns, workers=None):
+    """Returns the same dict of (site x day) arrays as sites.evaluate_sites,
+    computed by a pool of workers processes (os.cpu_count() if None)."""
+    workers = workers or os.cpu_count() or 1
+    lat, long, local_tz = site_arrays(lat, long, local_tz)
+    shape = (len(lat), len(dates))
+    probe = evaluate_sites(dates[:1], lat[:1], long[:1], local_tz[:1], columns)
+    dtypes = {name: probe[name].dtype for name in columns}
+    offsets, size = _layout(dtypes, shape)
+
+    # Split sites first, and days as well when there are too few sites to
+    # give every worker its share.
+    tasks = workers * TASKS_PER_WORKER
+    site_parts = _split(shape[0], tasks)
+    day_parts = _split(shape[1], -(-tasks // max(len(site_parts), 1)))
+
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _worker,
+                    shm.name,
+                    dtypes,
+                    shape,
+                    offsets,
+                    rows,
+                    days,
+                    dates[days[0] : days[1]],
+                    lat[rows[0] : rows[1]],
+                    long[rows[0] : rows[1]],
+                    local_tz[rows[0] : rows[1]],
+                )
+                for rows in site_parts
+                for days in day_parts
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+        # One copy out of the block, so it can be released before returning.
+        views = _views(shm.buf, dtypes, shape, offsets)
+        result = {name: view.copy() for name, view in views.items()}
+        del views
+    finally:
+        shm.close()
+        shm.unlink()
+    return result
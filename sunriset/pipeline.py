@@ -0,0 +1,239 @@
+# This file is released under the MIT License OSI Approved.
+"""The calculation chain of sunriset as a dependency graph.
+
+Each output column names the calc function that produces it and the columns
+or inputs it is computed from. evaluate() walks the graph for only the
+columns that were asked for, with either sunriset.calc (scalars) or
+sunriset.vcalc (arrays) as the engine.
+"""
+
+import datetime
+import functools
+import operator
+
+import pandas as pd
+
+from . import instrumentation
+
+# The inputs every evaluation is given.
+INPUTS = ("date", "lat", "long", "local_tz", "tz_adjust")
+# The inputs that differ from site to site.
+SITE_INPUTS = ("lat", "long")
+
+# Column name: (function name, argument names), in evaluation order.
+GRAPH = {
+    "Julian Day": ("julian_day", ("date", "local_tz")),
+    "Julian Century": ("julian_century", ("Julian Day",)),
+    "Solar Geometric Mean Longitude": (
+        "solar_geometric_mean_longitude",
+        ("Julian Century",),
+    ),
+    "Solar Geometric Mean Anomaly": (
+        "solar_geometric_mean_anomaly",
+        ("Julian Century",),
+    ),
+    "Eccentricity Earth Orbit": ("eccentricity_earth_orbit", ("Julian Century",)),
+    "Solar Equation of Center": (
+        "solar_equation_of_center",
+        ("Julian Century", "Solar Geometric Mean Anomaly"),
+    ),
+    "Solar True Longitude": (
+        "solar_true_longitude",
+        ("Solar Geometric Mean Longitude", "Solar Equation of Center"),
+    ),
+    "Solar True Anomaly": (
+        "solar_true_anomaly",
+        ("Solar Geometric Mean Anomaly", "Solar Equation of Center"),
+    ),
+    "Solar Radius Vector AUs": (
+        "solar_radius_vector_aus",
+        ("Eccentricity Earth Orbit", "Solar True Anomaly"),
+    ),
+    "Solar Apparent Longitude": (
+        "solar_apparent_longitude",
+        ("Solar True Longitude", "Julian Century"),
+    ),
+    "Mean Obliquity of Ecliptic": ("mean_obliquity_ecliptic", ("Julian Century",)),
+    "Obliquity Correction Degrees": (
+        "obliquity_correction_deg",
+        ("Mean Obliquity of Ecliptic", "Julian Century"),
+    ),
+    "Solar Accent Return": (
+        "solar_accent_return",
+        ("Solar Apparent Longitude", "Obliquity Correction Degrees"),
+    ),
+    "Solar Decline": (
+        "solar_decline",
+        ("Obliquity Correction Degrees", "Solar Apparent Longitude"),
+    ),
+    "Var Y": ("var_y", ("Obliquity Correction Degrees",)),
+    "Equation Of Time Min": (
+        "equation_of_time",
+        (
+            "Var Y",
+            "Solar Geometric Mean Longitude",
+            "Eccentricity Earth Orbit",
+            "Solar Geometric Mean Anomaly",
+        ),
+    ),
+    "Hour Angle Sunrise": ("hour_angle_sunrise", ("lat", "Solar Decline")),
+    "Solar Noon (float)": (
+        "solar_noon_float",
+        ("Equation Of Time Min", "long", "local_tz"),
+    ),
+    "Sunrise (float)": ("sunrise_float", ("Solar Noon (float)", "Hour Angle Sunrise")),
+    "Sunset (float)": ("sunset_float", ("Solar Noon (float)", "Hour Angle Sunrise")),
+    "Solar Noon": ("make_time", ("Solar Noon (float)", "date", "tz_adjust")),
+    "Sunrise": ("make_time", ("Sunrise (float)", "date", "tz_adjust")),
+    "Sunset": ("make_time", ("Sunset (float)", "date", "tz_adjust")),
+    "Sunlight Durration (minutes)": ("sunlight_duration", ("Hour Angle Sunrise",)),
+    "Ture Solar Time": (
+        "true_solar_time_min",
+        ("Equation Of Time Min", "long", "local_tz"),
+    ),
+    "Hour Angle Deg": ("hour_angle_deg", ("Ture Solar Time",)),
+    "Solar Zenith Angle (degrees)": (
+        "solar_zenith_angle",
+        ("lat", "Solar Decline", "Hour Angle Deg"),
+    ),
+    "Solar Elevation Angle (degrees)": (
+        "solar_elevation_angle",
+        ("Solar Zenith Angle (degrees)",),
+    ),
+    "Approximate Atmospheric Refraction (degrees)": (
+        "approx_atmospheric_refraction",
+        ("Solar Elevation Angle (degrees)",),
+    ),
+    "Solar Elevation Corrected ATM Refraction (degrees)": (
+        "solar_elevation_corrected_atm_refraction",
+        (
+            "Approximate Atmospheric Refraction (degrees)",
+            "Solar Elevation Angle (degrees)",
+        ),
+    ),
+    "Solar Azimuth Angle (degrees cw from North)": (
+        "solar_azimuth",
+        (
+            "Hour Angle Deg",
+            "lat",
+            "Solar Zenith Angle (degrees)",
+            "Solar Decline",
+        ),
+    ),
+    # Last, so the positions of the columns before it are as they always were.
+    "Sun Status": ("sun_status", ("lat", "Solar Decline")),
+}
+
+COLUMNS = list(GRAPH)
+
+
+_site_dependent = set(SITE_INPUTS)
+for _name, (_function, _arguments) in GRAPH.items():
+    if _site_dependent.intersection(_arguments):
+        _site_dependent.add(_name)
+
+# The columns that depend only on the date and time zone, not on the site.
+EPHEMERIS = [name for name in COLUMNS if name not in _site_dependent]
+
+
+def total_days(start_date, number_of_years):
+    """Returns the number of days in number_of_years, starting with start_date."""
+    year = int(start_date.year)
+    # Number of days claculation
+    return sum(
+        366 if year % 4 == 0 and year % 100 != 0 or year % 400 == 0 else 365
+        for _y in range(1, number_of_years + 1)
+    )
+
+
+def date_range(start_date, number_of_years):
+    """Returns a daily pandas DatetimeIndex of number_of_years from start_date."""
+    return pd.date_range(
+        start_date, periods=total_days(start_date, number_of_years), freq="D"
+    )
+
+
+def date_batches(start_date, number_of_years, batch_days, by_year):
+    """Yields DatetimeIndex batches of at most batch_days days, split at each
+    new year as well when by_year is true."""
+    days = total_days(start_date, number_of_years)
+    begin = 0
+    while begin < days:
+        first = start_date + datetime.timedelta(days=begin)
+        length = min(batch_days, days - begin)
+        if by_year:
+            new_year = datetime.date(first.year + 1, 1, 1)
+            length = min(length, (new_year - first).days)
+        yield pd.date_range(first, periods=length, freq="D")
+        begin += length
+
+
+def resolve(columns=None, known=()):
+    """Returns the columns that must be evaluated to produce columns, in
+    evaluation order, without descending past the names in known. With no
+    columns, every column in COLUMNS is needed."""
+    needed = set()
+    pending = list(COLUMNS if columns is None else columns)
+    while pending:
+        name = pending.pop()
+        if name in needed or name in INPUTS:
+            continue
+        if name not in GRAPH:
+            raise ValueError("Unknown column: {!r}".format(name))
+        needed.add(name)
+        if name not in known:
+            pending.extend(GRAPH[name][1])
+    return [name for name in COLUMNS if name in needed]
+
+
+def ephemeris_inputs(columns=None):
+    """Returns the EPHEMERIS columns that columns are computed from directly:
+    those asked for and those used by a site-dependent column."""
+    needed = resolve(columns)
+    used = set(COLUMNS if columns is None else columns)
+    for name in needed:
+        if name not in EPHEMERIS:
+            used.update(GRAPH[name][1])
+    return [name for name in needed if name in EPHEMERIS and name in used]
+
+
+@functools.lru_cache(maxsize=256)
+def _plan(columns, known):
+    """Returns the name, function name, an itemgetter of the arguments and
+    whether it returns a tuple of them, for each column evaluate() must compute
+    for columns, a tuple or None, when the names in known, a frozenset, are
+    given. Memoized, as the same few plans are asked for on every call."""
+    return tuple(
+        (
+            name,
+            GRAPH[name][0],
+            operator.itemgetter(*GRAPH[name][1]),
+            len(GRAPH[name][1]) > 1,
+        )
+        for name in resolve(columns, known)
+        if name not in known
+    )
+
+
+def evaluate(engine, columns=None, known=None, **inputs):
+    """Returns a dict of column name to value for columns, and every column
+    they depend on, with engine, sunriset.calc or sunriset.vcalc, and the
+    inputs date, lat, long, local_tz and tz_adjust as keyword arguments.
+
+    Columns already in the dict known, for example EPHEMERIS columns shared
+    by many sites, are used as they are instead of being evaluated again."""
+    values = dict(known or {})
+    values.update(inputs)
+    plan = _plan(None if columns is None else tuple(columns), frozenset(values))
+    recorder = instrumentation.active()
+    for name, function_name, arguments, several in plan:
+        function = getattr(engine, function_name)
+        if recorder is None:
+            arguments = arguments(values)
+            values[name] = function(*arguments) if several else function(arguments)
+            continue
+        stage = "{}.{}".format(engine.__name__.rpartition(".")[2], function_name)
+        with recorder.stage(stage):
+            arguments = arguments(values)
+            values[name] = function(*arguments) if several else function(arguments)
+    return values
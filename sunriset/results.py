@@ -0,0 +1,90 @@
+# This file is released under the MIT License OSI Approved.
+"""Compact, typed results.
+
+A single day is a SolarDay, a __slots__ record with one attribute per column,
+named after the calc function that computes it (solar_decline,
+hour_angle_sunrise, ...) and sunrise, sunset and solar_noon for the times. A
+range of days is one numpy structured array with a field per column.
+"""
+
+from . import calc, ephemeris
+from .pipeline import COLUMNS, GRAPH, date_range, evaluate
+from .sites import evaluate_sites
+from .stream import to_records
+
+
+def _attribute(name):
+    function = GRAPH[name][0]
+    return name.lower().replace(" ", "_") if function == "make_time" else function
+
+
+def _same(a, b):
+    return a == b or a != a and b != b
+
+
+# Column name: SolarDay attribute name.
+ATTRIBUTES = {name: _attribute(name) for name in COLUMNS}
+
+
+class SolarDay:
+    """The solar calculations for one date and site. Columns that were not
+    computed are None, as are Sunrise and Sunset on a polar day or night."""
+
+    __slots__ = ("date", "_columns") + tuple(ATTRIBUTES.values())
+
+    def __init__(self, date, values):
+        self.date = date
+        # The computed columns, in COLUMNS order.
+        self._columns = tuple(name for name in COLUMNS if name in values)
+        for name, attribute in ATTRIBUTES.items():
+            setattr(self, attribute, values.get(name))
+
+    def __repr__(self):
+        fields = ", ".join(
+            "{}={!r}".format(attribute, getattr(self, attribute))
+            for attribute in ("date",) + tuple(ATTRIBUTES.values())
+            if getattr(self, attribute) is not None
+        )
+        return "SolarDay({})".format(fields)
+
+    def __eq__(self, other):
+        if not isinstance(other, SolarDay):
+            return NotImplemented
+        # NaN, from a polar day or night, equals NaN here.
+        return all(
+            _same(getattr(self, a), getattr(other, a)) for a in self.__slots__
+        )
+
+    def as_dict(self):
+        """Returns the computed columns as a dict keyed by column name, including
+        those that are None, such as Sunrise on a polar day or night."""
+        return {name: getattr(self, ATTRIBUTES[name]) for name in self._columns}
+
+
+def solar_day(date, lat, long, local_tz, tz_adjust=0, columns=None):
+    """Returns a SolarDay of the calculations for date, a datetime.date, with
+    Latitude, lat, Longitude, long and Time Zone, local_tz. Pass a list of
+    names from sunriset.COLUMNS as columns to compute only those."""
+    columns = COLUMNS if columns is None else list(columns)
+    values = evaluate(
+        calc,
+        columns,
+        known=ephemeris.day(date, local_tz),
+        date=date,
+        lat=lat,
+        long=long,
+        local_tz=local_tz,
+        tz_adjust=tz_adjust,
+    )
+    return SolarDay(date, {name: values[name] for name in columns})
+
+
+def to_array(start_date, lat, long, local_tz, number_of_years, columns=None):
+    """Returns the calculations as one numpy structured array, a record per day
+    with a Date field and a field per column (see stream.record_dtype). With a
+    datetime.date for starting date, Latitude, lat, Longitude, long and Time
+    Zone, local_tz."""
+    columns = COLUMNS if columns is None else list(columns)
+    dates = date_range(start_date, number_of_years)
+    values = evaluate_sites(dates, lat, long, local_tz, columns)
+    return to_records(values, dates, columns)
@@ -0,0 +1,283 @@
+# This file is released under the MIT License OSI Approved.
+"""A local asyncio service for sunrise_set_noon.
+
+SolarService answers sunrise_set_noon requests from coroutines:
+
+    * answers are kept in an LRU cache keyed by (date, lat, long, local_tz),
+    * concurrent identical requests wait on one shared computation,
+    * distinct requests arriving within batch_delay seconds of each other, up
+      to batch_size of them, are evaluated together with one element-wise
+      vcalc evaluation in a worker thread,
+
+and keeps request, cache and batch counts, throughput and latency
+percentiles in its metrics.
+
+serve() puts a minimal HTTP/1.1 front end on it, built on asyncio streams
+alone, so it runs (and can be load tested) on one machine:
+
+    GET /sunrise_set_noon?date=2019-01-01&lat=34.0522&long=-118.2437&local_tz=-8
+    GET /metrics
+
+    $ python -m sunriset.server --port 8000
+"""
+
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import time
+import urllib.parse
+
+import numpy as np
+
+from . import vcalc
+from .pipeline import evaluate
+
+# The columns of a response, in the order sunrise_set_noon returns them.
+EVENTS = ("Sunrise", "Sunset", "Solar Noon")
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+def compute_batch(keys):
+    """Returns a list of (Sunrise, Sunset, Solar Noon) datetime.timedelta tuples,
+    None where there is no sunrise or sunset, for keys, a list of (date ordinal,
+    lat, long, local_tz) tuples, evaluated element-wise in one pass."""
+    ordinal, lat, long, local_tz = (np.array(value) for value in zip(*keys))
+    dates = (ordinal - vcalc.epoch_ordinal).astype("datetime64[D]")
+    with np.errstate(invalid="ignore"):
+        values = evaluate(
+            vcalc,
+            EVENTS,
+            date=dates,
+            lat=lat,
+            long=long,
+            local_tz=local_tz,
+            tz_adjust=0,
+        )
+    columns = [values[name].astype("m8[us]").tolist() for name in EVENTS]
+    return list(zip(*columns))
+
+
+class Metrics:
+    """Request, cache and batch counts, with the latencies of the last window
+    requests."""
+
+    def __init__(self, window=10000):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.computed = 0
+        self.batches = 0
+        self.latencies = collections.deque(maxlen=window)
+
+    def snapshot(self):
+        """Returns the metrics as a dict that json.dumps accepts."""
+        uptime = time.monotonic() - self.started
+        latencies = np.array(self.latencies) * 1000
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            latency = {
+                "mean": latencies.mean(),
+                "p50": p50,
+                "p90": p90,
+                "p99": p99,
+                "max": latencies.max(),
+            }
+        else:
+            latency = {}
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "computed": self.computed,
+            "batches": self.batches,
+            "mean_batch_size": self.computed / self.batches if self.batches else 0,
+            "uptime_seconds": uptime,
+            "requests_per_second": self.requests / uptime if uptime else 0,
+            "latency_ms": {name: float(value) for name, value in latency.items()},
+        }
+
+
+class SolarService:
+    """Answers sunrise_set_noon requests, coalescing identical ones, batching
+    distinct ones and caching cache_size answers. Use it from one event loop."""
+
+    def __init__(self, cache_size=65536, batch_size=1024, batch_delay=0.001):
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.metrics = Metrics()
+        self._cache = collections.OrderedDict()
+        self._pending = {}
+        self._queue = []
+        self._timer = None
+        self._tasks = set()
+
+    async def sunrise_set_noon(self, date, lat, long, local_tz):
+        """Returns the same tuple of datetime.timedelta for Sunrise, Sunset and
+        Solar Noon as sunriset.sunrise_set_noon, with None for a sunrise or
+        sunset that does not happen."""
+        started = time.perf_counter()
+        self.metrics.requests += 1
+        key = (date.toordinal(), float(lat), float(long), float(local_tz))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.metrics.cache_hits += 1
+            result = self._cache[key]
+        else:
+            if key in self._pending:
+                self.metrics.coalesced += 1
+            else:
+                self._submit(key)
+            result = await asyncio.shield(self._pending[key])
+        self.metrics.latencies.append(time.perf_counter() - started)
+        return result
+
+    def _submit(self, key):
+        loop = asyncio.get_running_loop()
+        self._pending[key] = loop.create_future()
+        self._queue.append(key)
+        if len(self._queue) >= self.batch_size:
+            self._start_batch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_delay, self._start_batch)
+
+    def _start_batch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        keys, self._queue = self._queue, []
+        if keys:
+            task = asyncio.get_running_loop().create_task(self._run_batch(keys))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, keys):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, compute_batch, keys)
+        except Exception as error:
+            for key in keys:
+                future = self._pending.pop(key)
+                future.set_exception(error)
+                # Waiters still see the error; with none left it is not logged.
+                future.exception()
+            return
+        self.metrics.batches += 1
+        self.metrics.computed += len(keys)
+        for key, result in zip(keys, results):
+            if self.cache_size > 0:
+                self._cache[key] = result
+            self._pending.pop(key).set_result(result)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+def _format(value):
+    return None if value is None else str(value)
+
+
+async def _respond(service, target):
+    """Returns the HTTP status and JSON body for the request target."""
+    url = urllib.parse.urlsplit(target)
+    if url.path == "/metrics":
+        return 200, service.metrics.snapshot()
+    if url.path != "/sunrise_set_noon":
+        return 404, {"error": "not found"}
+    query = dict(urllib.parse.parse_qsl(url.query))
+    try:
+        date = datetime.date.fromisoformat(query["date"])
+        site = [float(query[name]) for name in ("lat", "long", "local_tz")]
+    except (KeyError, ValueError) as error:
+        return 400, {"error": "bad request: {}".format(error)}
+    try:
+        sunrise, sunset, solar_noon = await service.sunrise_set_noon(date, *site)
+    except Exception as error:
+        return 500, {"error": "internal error: {}".format(error)}
+    return 200, {
+        "date": date.isoformat(),
+        "sunrise": _format(sunrise),
+        "sunset": _format(sunset),
+        "solar_noon": _format(solar_noon),
+    }
+
+
+async def _handle(service, reader, writer):
+    """Serves GET requests on one keep-alive connection until it closes."""
+    try:
+        while True:
+            request = await reader.readline()
+            if not request:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            method, target, _ = (request.decode("latin-1").split() + ["", ""])[:3]
+            if method == "GET":
+                status, body = await _respond(service, target)
+            else:
+                status, body = 405, {"error": "only GET is supported"}
+            payload = json.dumps(body).encode()
+            close = headers.get("connection", "").lower() == "close"
+            head = (
+                "HTTP/1.1 {} {}\r\n"
+                "Content-Type: application/json\r\n"
+                "Content-Length: {}\r\n"
+                "Connection: {}\r\n\r\n"
+            ).format(
+                status,
+                REASONS[status],
+                len(payload),
+                "close" if close else "keep-alive",
+            )
+            writer.write(head.encode() + payload)
+            await writer.drain()
+            if close:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000, service=None):
+    """Returns a started asyncio Server answering HTTP requests for service, a
+    SolarService (a new one by default), on host and port."""
+    service = service or SolarService()
+    return await asyncio.start_server(
+        lambda reader, writer: _handle(service, reader, writer), host, port
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve sunrise_set_noon over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-size", type=int, default=65536)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--batch-delay", type=float, default=0.001)
+    options = parser.parse_args(argv)
+    service = SolarService(options.cache_size, options.batch_size, options.batch_delay)
+
+    async def run():
+        server = await serve(options.host, options.port, service)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# This file is released under the MIT License OSI Approved.
+"""Solar calculations for many sites over one date range.
+
+The columns that depend only on the date and time zone (pipeline.EPHEMERIS:
+julian_century through solar_decline and equation_of_time) are evaluated
+once per date for each distinct time zone, then broadcast across every site
+in that time zone for the site-dependent columns such as hour_angle_sunrise
+and solar_noon_float.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import ephemeris, instrumentation, vcalc
+from .pipeline import COLUMNS, date_range, evaluate, resolve
+
+
+def site_arrays(lat, long, local_tz):
+    """Returns lat, long and local_tz broadcast to 1-D float arrays of equal length."""
+    return np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (lat, long, local_tz))
+    )
+
+
+def evaluate_sites(
+    dates, lat, long, local_tz, columns=None, tz_adjust=0, cache=True
+):
+    """Returns a dict of column name to a 2-D (site x day) array for dates, a
+    DatetimeIndex, and the site arrays lat, long and local_tz, which may be
+    empty. With cache false the shared ephemeris cache is not used."""
+    columns = COLUMNS if columns is None else list(columns)
+    lat, long, local_tz = site_arrays(lat, long, local_tz)
+    shape = (len(lat), len(dates))
+    if len(lat) == 0:
+        from .stream import column_dtype
+
+        # No sites: empty (0 x day) arrays, after checking the columns exist.
+        resolve(columns)
+        return {name: np.empty(shape, dtype=column_dtype(name)) for name in columns}
+
+    result = {}
+    for tz in np.unique(local_tz):
+        rows = np.flatnonzero(local_tz == tz)
+        with instrumentation.stage("ephemeris"):
+            known = ephemeris.days(dates, tz, columns, cache)
+        values = evaluate(
+            vcalc,
+            columns,
+            known=known,
+            date=dates,
+            lat=lat[rows, np.newaxis],
+            long=long[rows, np.newaxis],
+            local_tz=tz,
+            tz_adjust=tz_adjust,
+        )
+        for name in columns:
+            if name not in result:
+                result[name] = np.empty(shape, dtype=values[name].dtype)
+            result[name][rows] = values[name]
+    return result
+
+
+def long_frame(values, site_ids, dates, columns):
+    """Returns a DataFrame indexed by (Site, Date) of the (site x day) arrays in
+    values, for the site_ids and dates they were evaluated for."""
+    with instrumentation.stage("frame"):
+        index = pd.MultiIndex.from_product([site_ids, dates], names=["Site", "Date"])
+        return pd.DataFrame(
+            {name: values[name].ravel() for name in columns}, index=index
+        )
+
+
+def sites_to_arrays(
+    start_date, lat, long, local_tz, number_of_years, columns=None, workers=1
+):
+    """Returns a tuple of the daily DatetimeIndex and a dict of column name to a
+    2-D (site x day) array. With a datetime.date for starting date and arrays (or
+    scalars) of Latitude, lat, Longitude, long and Time Zone, local_tz, one per
+    site.
+
+    With workers other than 1 the sites and dates are split across a process
+    pool of that many workers, or one per CPU if workers is None."""
+    dates = date_range(start_date, number_of_years)
+    if workers == 1:
+        return dates, evaluate_sites(dates, lat, long, local_tz, columns)
+
+    from .parallel import evaluate_sites_parallel
+
+    columns = COLUMNS if columns is None else list(columns)
+    return dates, evaluate_sites_parallel(
+        dates, lat, long, local_tz, columns, workers
+    )
+
+
+def sites_to_pandas(
+    start_date,
+    lat,
+    long,
+    local_tz,
+    number_of_years,
+    columns=None,
+    site_ids=None,
+    layout="long",
+    workers=1,
+):
+    """Returns the solar calculations for many sites as Pandas objects. With a
+    datetime.date for starting date and arrays (or scalars) of Latitude, lat,
+    Longitude, long and Time Zone, local_tz, one per site.
+
+    With layout "long" a DataFrame indexed by (Site, Date) is returned, with
+    layout "wide" a dict of column name to a (site x day) DataFrame. Sites are
+    labelled with site_ids, or numbered from 0. See sites_to_arrays for
+    workers."""
+    columns = COLUMNS if columns is None else list(columns)
+    dates, values = sites_to_arrays(
+        start_date, lat, long, local_tz, number_of_years, columns, workers
+    )
+    if site_ids is None:
+        site_ids = pd.RangeIndex(len(site_arrays(lat, long, local_tz)[0]))
+    site_ids = pd.Index(site_ids)
+    if layout == "long":
+        return long_frame(values, site_ids, dates, columns)
+    if layout == "wide":
+        return {
+            name: pd.DataFrame(values[name], index=site_ids, columns=dates)
+            for name in columns
+        }
+    raise ValueError("layout must be 'long' or 'wide', not {!r}".format(layout))
@@ -0,0 +1,116 @@
+# This file is released under the MIT License OSI Approved.
+"""Memoized sunrise_set_noon for sites snapped to a grid of cells.
+
+SnappedCache rounds Latitude and Longitude to the nearest multiple of its
+tolerance, in degrees, and keeps the answer for each (cell, date, time zone)
+in a bounded LRU cache (an ephemeris.EphemerisCache), so nearby devices share
+one calculation. Every site in a cell gets the answer for the cell centre.
+
+Snapping moves a site by at most tolerance / 2 degrees on each axis. Solar
+noon moves 4 minutes per degree of longitude, so it is within 120 * tolerance
+seconds. Sunrise and sunset also move with latitude, by 4 minutes per degree
+times the rate their hour angle changes with latitude, which grows towards
+the poles; error_bound() gives the largest error over a year:
+
+    tolerance   0 deg     30 deg    45 deg    60 deg    65 deg
+    0.01        1.7 s     1.9 s     2.4 s     4.6 s     13 s
+    0.001       0.17 s    0.19 s    0.24 s    0.46 s    1.3 s
+
+(0.01 degrees of latitude is about 1.1 km.) Near polar day and night the
+bound grows without limit, as a cell edge can have a sunrise and its centre
+none.
+
+    >>> cache = sunriset.SnappedCache(tolerance=0.01)
+    >>> cache.sunrise_set_noon(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8)
+    >>> cache.hit_rate()
+"""
+
+import numpy as np
+
+from . import calc, ephemeris, vcalc
+from .ephemeris import EphemerisCache
+from .pipeline import evaluate
+
+# The declinations error_bound() considers, covering a year.
+DECLINATIONS = np.linspace(-23.44, 23.44, 469)
+
+
+def error_bound(lat, tolerance):
+    """Returns the largest difference, in seconds, over a year between the
+    Sunrise, Sunset or Solar Noon of a site at Latitude, lat, and of the centre
+    of its tolerance degree cell."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))[..., np.newaxis]
+    declination = np.radians(DECLINATIONS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hour_angle = np.radians(vcalc.hour_angle_sunrise(np.degrees(lat), DECLINATIONS))
+        # d(hour angle) / d(lat) at a fixed zenith, in degrees per degree.
+        rate = (
+            np.cos(lat) * np.sin(declination)
+            - np.sin(lat) * np.cos(declination) * np.cos(hour_angle)
+        ) / (np.cos(lat) * np.cos(declination) * np.sin(hour_angle))
+    rate = np.where(np.isnan(hour_angle), 0, np.abs(rate)).max(axis=-1)
+    return 240 * (rate + 1) * tolerance / 2
+
+
+class SnappedCache:
+    """sunrise_set_noon answers for the cells of a tolerance degree grid,
+    keeping the maxsize most recently used."""
+
+    def __init__(self, tolerance=0.01, maxsize=65536):
+        if tolerance <= 0:
+            raise ValueError("tolerance must be positive, not {!r}".format(tolerance))
+        self.tolerance = tolerance
+        # Cells per degree: dividing by it gives centres such as 34.05 exactly.
+        self._cells = 1 / tolerance
+        self._cache = EphemerisCache(maxsize)
+
+    def cell(self, lat, long):
+        """Returns the (row, column) of the cell of Latitude, lat and Longitude,
+        long."""
+        return round(lat * self._cells), round(long * self._cells)
+
+    def snap(self, lat, long):
+        """Returns the Latitude and Longitude of the centre of the cell of lat
+        and long."""
+        row, column = self.cell(lat, long)
+        return row / self._cells, column / self._cells
+
+    def sunrise_set_noon(self, date, lat, long, local_tz, tz_adjust=0):
+        """Returns sunriset.sunrise_set_noon for the centre of the cell of
+        Latitude, lat and Longitude, long, from the cache when it is there."""
+        row, column = self.cell(lat, long)
+
+        def compute():
+            centre_lat, centre_long = row / self._cells, column / self._cells
+            values = evaluate(
+                calc,
+                ["Sunrise", "Sunset", "Solar Noon"],
+                known=ephemeris.day(date, local_tz),
+                date=date,
+                lat=centre_lat,
+                long=centre_long,
+                local_tz=local_tz,
+                tz_adjust=tz_adjust,
+            )
+            return (values["Sunrise"], values["Sunset"], values["Solar Noon"])
+
+        key = (row, column, date.toordinal(), float(local_tz), tz_adjust)
+        return self._cache.get(key, compute)
+
+    def error_bound(self, lat):
+        """Returns error_bound() for Latitude, lat, and this cache's tolerance."""
+        return error_bound(lat, self.tolerance)
+
+    def info(self):
+        """Returns the hits, misses, maxsize and current size as a CacheInfo."""
+        return self._cache.info()
+
+    def hit_rate(self):
+        """Returns the fraction of lookups answered from the cache."""
+        info = self._cache.info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """Empties the cache and resets the statistics."""
+        self._cache.clear()
@@ -0,0 +1,96 @@
+# This file is released under the MIT License OSI Approved.
+"""Streaming the solar calculations in fixed-size batches of days.
+
+iter_batches() evaluates batch_days days at a time, for one site or many,
+and yields each batch as soon as it is computed, so an export of a century
+or of a whole site catalog holds only one batch in memory at a time. The
+batches bypass the shared ephemeris cache, which would otherwise keep them.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import COLUMNS, GRAPH, total_days
+from .sites import evaluate_sites, long_frame, site_arrays
+from .vcalc import STATUS_DTYPE
+
+
+# The numpy dtype of the columns of each vcalc function that is not float64.
+FUNCTION_DTYPES = {"make_time": np.dtype("m8[ns]"), "sun_status": STATUS_DTYPE}
+
+
+def column_dtype(name):
+    """Returns the numpy dtype of column name as evaluated by sunriset.vcalc."""
+    return FUNCTION_DTYPES.get(GRAPH[name][0], np.dtype("f8"))
+
+
+def record_dtype(columns=None, sites=False):
+    """Returns the numpy structured dtype of a record of columns: a Date field,
+    preceded by a Site field when sites is true, then one field per column."""
+    columns = COLUMNS if columns is None else columns
+    fields = [("Site", "i8")] if sites else []
+    fields.append(("Date", "M8[ns]"))
+    fields.extend((name, column_dtype(name)) for name in columns)
+    return np.dtype(fields)
+
+
+def to_records(values, dates, columns, sites=False, dtype=None):
+    """Returns a structured array of record_dtype(columns, sites), or dtype, from
+    values, a dict of (site x day) arrays evaluated for dates, a DatetimeIndex."""
+    n_sites = len(next(iter(values.values()))) if values else 1
+    n_days = len(dates)
+    dtype = record_dtype(columns, sites) if dtype is None else dtype
+    records = np.empty(n_sites * n_days, dtype=dtype)
+    if sites:
+        records["Site"] = np.repeat(np.arange(n_sites), n_days)
+    records["Date"] = np.tile(dates.values, n_sites)
+    for name in columns:
+        records[name] = values[name].ravel()
+    return records
+
+
+def iter_batches(
+    start_date,
+    lat,
+    long,
+    local_tz,
+    number_of_years,
+    columns=None,
+    batch_days=366,
+    as_frame=False,
+):
+    """Yields the solar calculations batch_days days at a time. With a
+    datetime.date for starting date, Latitude, lat, Longitude, long and Time
+    Zone, local_tz, either scalars for one site or arrays for many.
+
+    Each batch is a numpy structured array of record_dtype(columns), or with
+    as_frame a Pandas DataFrame indexed by Date. For many sites the records
+    also have a Site field (a (Site, Date) index for frames), numbered from 0,
+    and a batch holds batch_days days of every site."""
+    if batch_days < 1:
+        raise ValueError("batch_days must be 1 or more, not {!r}".format(batch_days))
+    columns = COLUMNS if columns is None else list(columns)
+    sites = any(np.ndim(value) > 0 for value in (lat, long, local_tz))
+    lat, long, local_tz = site_arrays(lat, long, local_tz)
+    days = total_days(start_date, number_of_years)
+    dtype = record_dtype(columns, sites)
+
+    for begin in range(0, days, batch_days):
+        batch_dates = pd.date_range(
+            start_date + datetime.timedelta(days=begin),
+            periods=min(batch_days, days - begin),
+            freq="D",
+        )
+        values = evaluate_sites(
+            batch_dates, lat, long, local_tz, columns, cache=False
+        )
+        if not as_frame:
+            yield to_records(values, batch_dates, columns, sites, dtype)
+        elif sites:
+            yield long_frame(values, pd.RangeIndex(len(lat)), batch_dates, columns)
+        else:
+            yield pd.DataFrame(
+                {name: values[name][0] for name in columns}, index=batch_dates
+            )
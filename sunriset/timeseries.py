@@ -0,0 +1,74 @@
+# This file is released under the MIT License OSI Approved.
+"""Solar position through the day on a regular time grid.
+
+pipeline evaluates the sun position once a day, at local noon. Here the
+date-only terms, solar_decline and equation_of_time, are evaluated once per
+day and reused for every time step of that day, and only the hour angle and
+the position trigonometry are evaluated on the full (day x step) grid. The
+per-day terms come from the shared sunriset.ephemeris cache.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import ephemeris, vcalc
+from .pipeline import date_range
+
+ELEVATION = "Solar Elevation Angle (degrees)"
+AZIMUTH = "Solar Azimuth Angle (degrees cw from North)"
+CORRECTED_ELEVATION = "Solar Elevation Corrected ATM Refraction (degrees)"
+NANOSECONDS_PER_DAY = 86400 * 10**9
+
+
+def time_offsets(freq):
+    """Returns the int64 nanoseconds from midnight of the time steps every freq
+    (anything pandas.Timedelta accepts, such as "5min") through a day."""
+    step = pd.Timedelta(freq).value
+    if step <= 0:
+        raise ValueError("freq must be a positive time step, not {!r}".format(freq))
+    return np.arange(0, NANOSECONDS_PER_DAY, step, dtype=np.int64)
+
+
+def sun_path(dates, lat, long, local_tz, time_of_day):
+    """Returns a dict of column name to a 2-D (day x step) array of the Solar
+    Zenith, Elevation, refraction corrected Elevation and Azimuth angles. With
+    dates, a DatetimeIndex, Latitude, lat, Longitude, long, Time Zone, local_tz
+    and time_of_day, an array of local times as fractions of a day."""
+    values = ephemeris.days(
+        dates, local_tz, ["Solar Decline", "Equation Of Time Min"]
+    )
+    sdec = values["Solar Decline"][:, np.newaxis]
+    eqtm = values["Equation Of Time Min"][:, np.newaxis]
+    time_of_day = np.asarray(time_of_day, dtype=np.float64)[np.newaxis, :]
+
+    trst = vcalc.true_solar_time_min(eqtm, long, local_tz, time_of_day)
+    hand = vcalc.hour_angle_deg(trst)
+    with np.errstate(invalid="ignore"):
+        szen = vcalc.solar_zenith_angle(lat, sdec, hand)
+        sela = vcalc.solar_elevation_angle(szen)
+        aprx = vcalc.approx_atmospheric_refraction(sela)
+        azmt = vcalc.solar_azimuth(hand, lat, szen, sdec)
+    return {
+        "Solar Zenith Angle (degrees)": szen,
+        ELEVATION: sela,
+        CORRECTED_ELEVATION: vcalc.solar_elevation_corrected_atm_refraction(
+            aprx, sela
+        ),
+        AZIMUTH: azmt,
+    }
+
+
+def solar_position(start_date, lat, long, local_tz, number_of_years, freq="1min"):
+    """Returns a Pandas DataFrame of the sun position every freq (anything
+    pandas.Timedelta accepts, such as "5min") through each day. With a
+    datetime.date for starting date, Latitude, lat, Longitude, long and Time
+    Zone, local_tz. The index is local standard time."""
+    dates = date_range(start_date, number_of_years)
+    offsets = time_offsets(freq)
+
+    path = sun_path(dates, lat, long, local_tz, offsets / NANOSECONDS_PER_DAY)
+    index = pd.DatetimeIndex(
+        (dates.values[:, np.newaxis] + offsets.astype("m8[ns]")).ravel()
+    )
+    columns = (ELEVATION, CORRECTED_ELEVATION, AZIMUTH)
+    return pd.DataFrame({name: path[name].ravel() for name in columns}, index=index)
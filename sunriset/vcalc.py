@@ -0,0 +1,371 @@
+# This file is released under the MIT License OSI Approved.
+"""Array versions of the functions in sunriset.calc.
+
+Every function here has the same name and arguments as its counterpart in
+sunriset.calc and returns the same numbers, but accepts NumPy arrays (or
+anything np.asarray understands) and broadcasts like a ufunc. The Python
+``if`` branches in calc are expressed with masks and np.where so a whole
+column of days or sites is evaluated in one call.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .calc import POLAR_DAY, POLAR_NIGHT, RISES_AND_SETS
+
+ordinal_adj = 1721424.5
+days_century = 2451545  # this is Saturday, A.D. 2000 Jan 1  in the Julian Calendar
+day_per_century = 36525
+# datetime.date(1970, 1, 1).toordinal(), the epoch of numpy datetime64
+epoch_ordinal = 719163
+# The dtype of sun_status, long enough for each of the statuses in calc.
+STATUS_DTYPE = np.dtype("U11")
+
+
+def make_time(time_float, d_utz, tz_adjust):
+    """Returns time_float, in days, as a numpy timedelta64[ns] array.
+
+    The value is rounded to whole microseconds, the resolution of the
+    datetime.timedelta returned by calc.make_time. d_utz is a placeholder,
+    as it is in calc.make_time.
+    """
+    days = np.asarray(time_float, dtype=np.float64) + tz_adjust
+    micros = np.rint(days * 86400000000.0)
+    out = np.full(micros.shape, np.timedelta64("NaT"), dtype="m8[ns]")
+    valid = np.isfinite(micros)
+    out[valid] = micros[valid].astype(np.int64) * 1000
+    return out
+
+
+def make_date_time(time_float, d_utz, local_tz, local_pytz):
+    """Returns time_float, in days since midnight of the dates d_utz in the
+    standard time of local_tz, as a flat, timezone aware pandas DatetimeIndex in
+    local_pytz (a pytz timezone or its name), daylight saving time included.
+
+    The times are converted from UTC with DatetimeIndex.tz_convert, which looks
+    up the zone's transitions for the whole array at once.
+    """
+    midnight = np.asarray(d_utz, dtype="datetime64[D]").astype("M8[ns]")
+    utc = midnight + make_time(time_float, d_utz, -np.asarray(local_tz) / 24)
+    return pd.DatetimeIndex(utc.ravel()).tz_localize("UTC").tz_convert(local_pytz)
+
+
+def julian_day(usr_date, tz=0):
+    """Returns local Julian Day floats with an array of dates, usr_date, and
+    time zone, tz as a positive or negative number (or array).
+
+    usr_date may be numpy datetime64 values, a pandas DatetimeIndex or a
+    sequence of datetime.date objects. Any time of day is dropped, as it is in
+    calc.julian_day.
+    """
+    days = np.asarray(usr_date, dtype="datetime64[D]").astype(np.int64)
+    return days + (epoch_ordinal + ordinal_adj) + 0.5 - np.asarray(tz) / 24
+
+
+def julian_century(jd_local):
+    """Returns the Julian Century with Julian Day, jd_local.
+
+    Days before 2000 Jan 1 are measured from the start of their own century,
+    exactly as the search loop in calc.julian_century does.
+    """
+    jd_local = np.asarray(jd_local, dtype=np.float64)
+    centuries_back = np.ceil((days_century - jd_local) / day_per_century)
+    centuries_back = np.clip(centuries_back, 0, days_century // day_per_century + 1)
+    start = days_century - centuries_back * day_per_century
+    return (jd_local - start) / day_per_century
+
+
+def solar_geometric_mean_longitude(julian_century):
+    """Returns the Solar Geometric Mean with Julian Century, julian_century."""
+    return (
+        280.46646 + julian_century * (36000.76983 + julian_century * 0.0003032)
+    ) % 360
+
+
+def solar_geometric_mean_anomaly(julian_century):
+    """Returns the Anomaly of Solar Geometric Mean with Julian Century, julian_century."""
+    return 357.52911 + julian_century * (35999.05029 - 0.0001537 * julian_century)
+
+
+def eccentricity_earth_orbit(julian_century):
+    """Returns the Eccentricity or Earth Orbit with Julian Century, julian_century."""
+    return 0.016708634 - julian_century * (0.000042037 + 0.0000001267 * julian_century)
+
+
+def solar_equation_of_center(julian_century, solar_geometric_mean_anomaly):
+    """Returns the Solar Equation of Center with Julian Century, julian_century and
+    Solar Geometric Mean Anomaly, solar_geometric_mean_anomaly."""
+    return (
+        np.sin(np.radians(solar_geometric_mean_anomaly))
+        * (1.914602 - julian_century * (0.004817 + 0.000014 * julian_century))
+        + np.sin(np.radians(2 * solar_geometric_mean_anomaly))
+        * (0.019993 - 0.000101 * julian_century)
+        + np.sin(np.radians(3 * solar_geometric_mean_anomaly)) * 0.000289
+    )
+
+
+def solar_true_longitude(solar_geometric_mean_longitude, solar_equation_of_center):
+    """Returns the Solar True Longitude with Solar Geometric Mean Longitude,
+    solar_geometric_mean_longitude, and Solar Equation of Center,
+    solar_equation_of_center."""
+    return solar_geometric_mean_longitude + solar_equation_of_center
+
+
+def solar_true_anomaly(solar_geometric_mean_anomaly, solar_equation_of_center):
+    """Returns the Solar True Anomaly with Solar Geometric Mean Anomaly,
+    solar_geometric_mean_anomaly, and Solar Equation of Center,
+    solar_equation_of_center."""
+    return solar_geometric_mean_anomaly + solar_equation_of_center
+
+
+def solar_radius_vector_aus(eccentricity_earth_orbit, solar_true_anomaly):
+    """Returns the Solar Radius Vector in Astronomical Units, (AUs), with
+    Eccentricity of Earth's Orbit, eccentricity_earth_orbit, and Solar True
+    Anomaly, solar_true_anomaly."""
+    return (1.000001018 * (1 - eccentricity_earth_orbit**2)) / (
+        1 + eccentricity_earth_orbit * np.cos(np.radians(solar_true_anomaly))
+    )
+
+
+def solar_apparent_longitude(solar_true_longitude, julian_century):
+    """Returns the SolarApparentLongitude with Solar True Longitude,
+    solar_true_longitude, and Julian Century, julian_century."""
+    return (
+        solar_true_longitude
+        - 0.00569
+        - 0.00478 * np.sin(np.radians(125.04 - 1934.136 * julian_century))
+    )
+
+
+def mean_obliquity_ecliptic(julian_century):
+    """Returns the Mean Obliquity of Ecliptic in Degrees with Julian Century,
+    julian_century."""
+    return (
+        23
+        + (
+            26
+            + (
+                (
+                    21.448
+                    - julian_century
+                    * (46.815 + julian_century * (0.00059 - julian_century * 0.001813))
+                )
+            )
+            / 60
+        )
+        / 60
+    )
+
+
+def obliquity_correction_deg(mean_obliquity_of_ecliptic_deg, julian_century):
+    """Returns Obliquity Correction in Degrees with Mean Obliquity Ecliptic,
+    mean_obliquity_of_ecliptic_deg and Julian Century, julian_century."""
+    return mean_obliquity_of_ecliptic_deg + 0.00256 * np.cos(
+        np.radians(125.04 - 1934.136 * julian_century)
+    )
+
+
+def solar_accent_return(solar_apparent_longitude, obliquity_correction):
+    """Returns SolarAccentReturn with Solar Apparent Longitude,
+    solar_apparent_longitude and Obliquity Correction , obliquity_correction"""
+    return np.degrees(
+        np.arctan2(
+            np.cos(np.radians(solar_apparent_longitude)),
+            np.cos(np.radians(obliquity_correction))
+            * np.sin(np.radians(solar_apparent_longitude)),
+        )
+    )
+
+
+def solar_decline(obliquity_correction, solar_apparent_longitude):
+    """Returns Solar Decline in degrees, with Obliquity Correction, obliquity_correction
+    Solar Apparent Longitude, solar_apparent_longitude"""
+    return np.degrees(
+        np.arcsin(
+            np.sin(np.radians(obliquity_correction))
+            * np.sin(np.radians(solar_apparent_longitude))
+        )
+    )
+
+
+def var_y(obliquity_correction):
+    """Returns Var Y with Obliquity Correction, obliquity_correction"""
+    return np.tan(np.radians(obliquity_correction / 2)) * np.tan(
+        np.radians(obliquity_correction / 2)
+    )
+
+
+def equation_of_time(
+    var_y,
+    solar_geometric_mean_longitude,
+    eccentricity_earth_orbit,
+    solar_geometric_mean_anomaly,
+):
+    """Returns Equation Of Time, in minutes, with Var Y, var_y,
+    Solar Geometric Mean Longitude, solar_geometric_mean_longitude,
+    Eccentricity Earth Orbit, eccentricity_earth_orbit, Solar Geometric
+    Mean Anomaly, solar_geometric_mean_anomaly.
+    """
+    return 4 * np.degrees(
+        var_y * np.sin(2 * np.radians(solar_geometric_mean_longitude))
+        - 2
+        * eccentricity_earth_orbit
+        * np.sin(np.radians(solar_geometric_mean_anomaly))
+        + 4
+        * eccentricity_earth_orbit
+        * var_y
+        * np.sin(np.radians(solar_geometric_mean_anomaly))
+        * np.cos(2 * np.radians(solar_geometric_mean_longitude))
+        - 0.5
+        * var_y
+        * var_y
+        * np.sin(4 * np.radians(solar_geometric_mean_longitude))
+        - 1.25
+        * eccentricity_earth_orbit
+        * eccentricity_earth_orbit
+        * np.sin(2 * np.radians(solar_geometric_mean_anomaly))
+    )
+
+
+def _cos_hour_angle(lat, solar_decline, zenith):
+    return np.cos(np.radians(zenith)) / (
+        np.cos(np.radians(lat)) * np.cos(np.radians(solar_decline))
+    ) - np.tan(np.radians(lat)) * np.tan(np.radians(solar_decline))
+
+
+def hour_angle_sunrise(lat, solar_decline, zenith=90.833):
+    """Returns Hour Angle, in degrees, with Latitude, lat and Solar Decline Deg,
+    solar_decline at which the sun crosses the Zenith angle, zenith, which
+    defaults to sunrise.
+
+    Where the sun never rises or never sets, a polar day or night, the
+    elements are NaN, as in calc.hour_angle_sunrise, without a warning.
+    """
+    cos_hour_angle = _cos_hour_angle(lat, solar_decline, zenith)
+    inside = np.abs(cos_hour_angle) <= 1
+    return np.degrees(np.arccos(np.where(inside, cos_hour_angle, np.nan)))
+
+
+def sun_status(lat, solar_decline, zenith=90.833):
+    """Returns an array of calc.POLAR_DAY where the sun stays above the Zenith
+    angle, zenith, all day with Latitude, lat and Solar Decline Deg,
+    solar_decline, calc.POLAR_NIGHT where it stays below and
+    calc.RISES_AND_SETS otherwise."""
+    cos_hour_angle = _cos_hour_angle(lat, solar_decline, zenith)
+    status = np.full(cos_hour_angle.shape, RISES_AND_SETS, dtype=STATUS_DTYPE)
+    status[cos_hour_angle < -1] = POLAR_DAY
+    status[cos_hour_angle > 1] = POLAR_NIGHT
+    return status
+
+
+def solar_noon_float(equation_of_time, long, local_tz):
+    """Returns Solar Noon as a float with the Equation Of Time, equation_of_time"""
+    return (720 - 4 * long - equation_of_time + local_tz * 60) / 1440
+
+
+def sunrise_float(solar_noon_float, hour_angle_sunrise):
+    """Returns Sunrise as float with Solar Noon Float, solar_noon_float
+    and Hour Angle Deg, hour_angle_deg"""
+    return (solar_noon_float * 1440 - hour_angle_sunrise * 4) / 1440
+
+
+def sunset_float(solar_noon_float, hour_angle_sunrise):
+    """Returns Sunset as float with Solar Noon Float, solar_noon_float
+    and Hour Angle Deg, hour_angle_deg"""
+    return (solar_noon_float * 1440 + hour_angle_sunrise * 4) / 1440
+
+
+def sunlight_duration(hour_angle_sunrise):
+    """Returns the duration of Sunlight, in minutes, with Hour Angle in degrees,
+    hour_angle."""
+    return 8 * hour_angle_sunrise
+
+
+def true_solar_time_min(equation_of_time, long, local_tz, time_of_day=0.5):
+    """Returns True Solar time in minutes, with Equation of Time, equation_of_time,
+    Longitude, long, Local Time Zone, local tz and the local Time of Day,
+    time_of_day, as a fraction of a day, which defaults to noon."""
+    return (time_of_day * 1440 + equation_of_time + 4 * long - 60 * local_tz) % 1440
+
+
+def hour_angle_deg(true_solar_time):
+    """Returns Hour Angle in Degrees, with True Solar Time, true_solar_time."""
+    return np.where(
+        true_solar_time < 0, true_solar_time / 4 + 180, true_solar_time / 4 - 180
+    )
+
+
+def solar_zenith_angle(lat, solar_decline, hour_angle):
+    """Returns Solar Zenith Angle in Degrees, with Latitude, lat, Solar Decline (Degrees),
+    solar_decline, Hour Angle (Degrees), hour_angle. It is NaN, without a warning,
+    where it is undefined."""
+    with np.errstate(invalid="ignore"):
+        return np.degrees(
+            np.arccos(
+                np.sin(np.radians(lat)) * np.sin(np.radians(solar_decline))
+                + np.cos(np.radians(lat))
+                * np.cos(np.radians(solar_decline))
+                * np.cos(np.radians(hour_angle))
+            )
+        )
+
+
+def solar_elevation_angle(solar_zenith_angle):
+    """Returns Solar Angle in Degrees, with Solar Zenith Angle, solar_zenith_angle."""
+    return 90 - solar_zenith_angle
+
+
+def approx_atmospheric_refraction(solar_elevation_angle):
+    """Returns Approximate Atmospheric Refraction in degrees with Solar Elevation
+    Angle, solar_elevation_angle."""
+    elevation = np.asarray(solar_elevation_angle, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tan_elevation = np.tan(np.radians(elevation))
+        high = (
+            58.1 / tan_elevation
+            - 0.07 / tan_elevation**3
+            + 0.000086 / tan_elevation**5
+        ) / 3600
+        low = (
+            1735
+            + elevation
+            * (
+                -518.2
+                + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711))
+            )
+        ) / 3600
+        below = (-20.772 / tan_elevation) / 3600
+    return np.select(
+        [elevation > 85, elevation > 5, elevation > -0.575],
+        [0.0, high, low],
+        below,
+    )
+
+
+def solar_elevation_corrected_atm_refraction(
+    approx_atmospheric_refraction, solar_elevation_angle
+):
+    """Returns the Solar Elevation Corrected Atmospheric Refraction, with the
+    Approximate Atmospheric Refraction, approx_atmospheric_refraction and Solar
+    Elevation Angle, solar_elevation_angle."""
+    return approx_atmospheric_refraction + solar_elevation_angle
+
+
+def solar_azimuth(hour_angle, lat, solar_zenith_angle, solar_decline):
+    """Returns Solar Azimuth Angle Degrees Clockwise from North, with Hour Angle,
+    hour_angle, Latitude, lat and Solar Zenith Angle, solar_zenith_angle and Solar
+    Decline, solar_decline. It is NaN, without a warning, where it is undefined, as
+    at the poles."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        angle = np.degrees(
+            np.arccos(
+                (
+                    np.sin(np.radians(lat)) * np.cos(np.radians(solar_zenith_angle))
+                    - np.sin(np.radians(solar_decline))
+                )
+                / (np.cos(np.radians(lat)) * np.sin(np.radians(solar_zenith_angle)))
+            )
+        )
+    # cos(radians(90)) is 6e-17, not 0, so test the poles themselves.
+    angle = np.where(np.abs(lat) == 90, np.nan, angle)
+    return np.where(hour_angle > 0, (angle + 180) % 360, (540 - angle) % 360)
@@ -0,0 +1,212 @@
+# This file is released under the MIT License OSI Approved.
+"""The solar window: sunrise, sunset and direct sun behind a skyline.
+
+Sunrise and Sunset assume a flat horizon. Here each site has a horizon
+profile, the elevation angle of the terrain or buildings (degrees) at a set
+of azimuths (degrees cw from North), interpolated around the circle. The sun
+is visible when its upper limb, seen through refraction(), clears the
+profile: its Solar Elevation is above the profile less the refraction at the
+profile's height and SEMI_DIAMETER. On a flat profile of 0 that puts sun up
+and sun down at the crossing of the 90.833 degree zenith that twilight()
+refines, within 3 seconds at Los Angeles and 8 at 60 degrees North at the
+default freq. The Sunrise and Sunset columns hold the sun at its noon Solar
+Decline and Equation Of Time all day, so they differ from both by more: up to
+19 seconds at Los Angeles in 2019 and about a minute at 60 degrees.
+
+sun_paths() evaluates the sun path of every day once on a regular time grid,
+interpolating the Solar Decline and Equation Of Time between local midnights,
+and solar_window() takes the windows of all days from it in one pass for each
+profile: between two steps the Solar Elevation is taken as linear, which
+places each crossing within seconds at a freq of 5 minutes. Consecutive sites
+at the same Latitude, Longitude and Time Zone, such as the rooftops of one
+block, share one sun path.
+
+For each day Sun Up is the first time the sun comes into view and Sun Down
+the last time it goes out of view (NaT when it does neither, as on a polar
+day or night), and Direct Sun is the minutes it is in view, including any
+gaps between buildings.
+
+    >>> azimuth = np.arange(0, 360, 10)
+    >>> skyline = np.where((azimuth > 60) & (azimuth < 120), 15.0, 2.0)
+    >>> sunriset.window.solar_windows(datetime.date(2019, 1, 1), 34.05, -118.24,
+    ...                               -8, 1, azimuth, skyline)
+"""
+
+import numpy as np
+
+from . import ephemeris, vcalc
+from .pipeline import date_range
+from .sites import long_frame, site_arrays
+from .timeseries import NANOSECONDS_PER_DAY, time_offsets
+
+# The angular radius of the sun, in degrees: a zenith of 90.833 is the upper
+# limb at the horizon, 0.5667 degrees of refraction and this.
+SEMI_DIAMETER = 0.2667
+# The ephemeris sun_paths() interpolates through each day.
+EPHEMERIS_COLUMNS = ("Solar Decline", "Equation Of Time Min")
+SUN_UP = "Sun Up"
+SUN_DOWN = "Sun Down"
+DIRECT_SUN = "Direct Sun (minutes)"
+WINDOW_COLUMNS = (SUN_UP, SUN_DOWN, DIRECT_SUN)
+
+
+def time_grid(freq="5min"):
+    """Returns the local times, as fractions of a day, every freq (anything
+    pandas.Timedelta accepts) from midnight to the next midnight, both
+    included."""
+    return np.append(time_offsets(freq) / NANOSECONDS_PER_DAY, 1.0)
+
+
+def refraction(elevation):
+    """Returns the atmospheric refraction, in degrees, of something seen at the
+    apparent elevation, in degrees, by Bennett's formula."""
+    elevation = np.asarray(elevation, dtype=np.float64)
+    return 1 / np.tan(np.radians(elevation + 7.31 / (elevation + 4.4))) / 60
+
+
+def sun_paths(dates, lat, long, local_tz, time_of_day):
+    """Returns the Solar Elevation and Solar Azimuth, (day x step) arrays in
+    degrees, for dates, a DatetimeIndex of consecutive days, Latitude, lat,
+    Longitude, long and Time Zone, local_tz, at time_of_day, local times as
+    fractions of a day."""
+    # julian_day is at local noon.
+    midnights = vcalc.julian_day(dates, local_tz) - 0.5
+    values = ephemeris.at(np.append(midnights, midnights[-1] + 1), EPHEMERIS_COLUMNS)
+    time_of_day = np.asarray(time_of_day, dtype=np.float64)[np.newaxis, :]
+    sdec, eqtm = (
+        values[name][:-1, np.newaxis]
+        + time_of_day * np.diff(values[name])[:, np.newaxis]
+        for name in EPHEMERIS_COLUMNS
+    )
+    hand = vcalc.hour_angle_deg(
+        vcalc.true_solar_time_min(eqtm, long, local_tz, time_of_day)
+    )
+    szen = vcalc.solar_zenith_angle(lat, sdec, hand)
+    with np.errstate(invalid="ignore"):
+        azmt = vcalc.solar_azimuth(hand, lat, szen, sdec)
+    return vcalc.solar_elevation_angle(szen), azmt
+
+
+def _interpolation(azimuth, horizon_azimuth):
+    """Returns the order of the points of a profile at horizon_azimuth and, for
+    each azimuth, the index of the profile point before it, of the point after
+    it and its fraction of the way between them, going round the circle. The
+    indices are into the ordered profile with its last point before it and its
+    first after it."""
+    horizon_azimuth = np.asarray(horizon_azimuth, dtype=np.float64) % 360
+    order = np.argsort(horizon_azimuth)
+    points = horizon_azimuth[order]
+    points = np.concatenate([points[-1:] - 360, points, points[:1] + 360])
+    azimuth = azimuth % 360
+    after = np.searchsorted(points, azimuth, side="right").clip(1, len(points) - 1)
+    before = after - 1
+    width = points[after] - points[before]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(width > 0, (azimuth - points[before]) / width, 0.0)
+    return order, before, after, fraction
+
+
+def _window(elevation, interpolation, time_of_day, horizon_elevation, limb):
+    order, before, after, fraction = interpolation
+    # The Solar Elevation at which the upper limb clears each profile point.
+    horizon_elevation = np.asarray(horizon_elevation, dtype=np.float64)[order]
+    threshold = horizon_elevation - refraction(horizon_elevation) - limb
+    threshold = np.concatenate([threshold[-1:], threshold, threshold[:1]])
+    margin = elevation - threshold[before]
+    margin -= fraction * (threshold[after] - threshold[before])
+
+    before, after = margin[:, :-1], margin[:, 1:]
+    seen_before, seen_after = before > 0, after > 0
+    step = np.diff(time_of_day)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Where in each step the margin crosses 0, as a fraction of the step.
+        crossing = before / (before - after)
+    rises = ~seen_before & seen_after
+    sets = seen_before & ~seen_after
+    seen = np.where(
+        seen_before,
+        np.where(seen_after, 1.0, crossing),
+        np.where(seen_after, 1 - crossing, 0.0),
+    )
+
+    days = np.arange(len(margin))
+    first = rises.argmax(axis=1)
+    last = sets.shape[1] - 1 - sets[:, ::-1].argmax(axis=1)
+    sun_up = time_of_day[first] + crossing[days, first] * step[first]
+    sun_down = time_of_day[last] + crossing[days, last] * step[last]
+    return {
+        SUN_UP: np.where(rises.any(axis=1), sun_up, np.nan),
+        SUN_DOWN: np.where(sets.any(axis=1), sun_down, np.nan),
+        DIRECT_SUN: seen @ (step * 1440),
+    }
+
+
+def solar_window(
+    elevation,
+    azimuth,
+    time_of_day,
+    horizon_azimuth,
+    horizon_elevation,
+    limb=SEMI_DIAMETER,
+):
+    """Returns a dict of Sun Up and Sun Down, as fractions of a day (NaN where
+    there is none), and Direct Sun, in minutes, for each day of a sun path:
+    elevation and azimuth, (day x step) arrays in degrees from sun_paths() at
+    time_of_day, the times of a time_grid(). The horizon profile is
+    horizon_elevation at horizon_azimuth, in degrees. limb is the angle the
+    sun must clear the profile by, its upper limb by default; 0 follows the
+    centre of the sun."""
+    interpolation = _interpolation(azimuth, horizon_azimuth)
+    return _window(elevation, interpolation, time_of_day, horizon_elevation, limb)
+
+
+def solar_windows(
+    start_date,
+    lat,
+    long,
+    local_tz,
+    number_of_years,
+    horizon_azimuth,
+    horizon_elevation,
+    freq="5min",
+    limb=SEMI_DIAMETER,
+    site_ids=None,
+):
+    """Returns a Pandas DataFrame indexed by (Site, Date) of the Sun Up and Sun
+    Down times, since local midnight, and Direct Sun minutes of each site and
+    day. With a datetime.date for starting date, arrays (or scalars) of
+    Latitude, lat, Longitude, long and Time Zone, local_tz, one per site, and
+    horizon profiles of horizon_elevation, a (site x azimuth) array or one
+    profile (or height) for every site, at horizon_azimuth, a 1-D array, in
+    degrees."""
+    horizon_azimuth = np.asarray(horizon_azimuth, dtype=np.float64)
+    horizon_elevation = np.asarray(horizon_elevation, dtype=np.float64)
+    if horizon_elevation.ndim < 2:
+        horizon_elevation = np.broadcast_to(horizon_elevation, horizon_azimuth.shape)
+        horizon_elevation = horizon_elevation[np.newaxis]
+    lat, long, local_tz, _ = np.broadcast_arrays(
+        *site_arrays(lat, long, local_tz), horizon_elevation[:, 0]
+    )
+    horizon_elevation = np.broadcast_to(
+        horizon_elevation, (len(lat), horizon_elevation.shape[1])
+    )
+    site_ids = np.arange(len(lat)) if site_ids is None else np.asarray(site_ids)
+    dates = date_range(start_date, number_of_years)
+    time_of_day = time_grid(freq)
+
+    values = {name: np.empty((len(lat), len(dates))) for name in WINDOW_COLUMNS}
+    paths = {}
+    for site in range(len(lat)):
+        key = (lat[site], long[site], local_tz[site])
+        if key not in paths:
+            elevation, azimuth = sun_paths(dates, *key, time_of_day)
+            paths = {key: (elevation, _interpolation(azimuth, horizon_azimuth))}
+        elevation, interpolation = paths[key]
+        window = _window(
+            elevation, interpolation, time_of_day, horizon_elevation[site], limb
+        )
+        for name in WINDOW_COLUMNS:
+            values[name][site] = window[name]
+    for name in (SUN_UP, SUN_DOWN):
+        values[name] = vcalc.make_time(values[name], None, 0)
+    return long_frame(values, site_ids, dates, WINDOW_COLUMNS)
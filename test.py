@@ -1,10 +1,24 @@
 #!/usr/bin/env python
 
+import asyncio
 import datetime
+import io
+import json
+import math
+import os
+import tempfile
+import threading
 import unittest
+import unittest.mock
+import warnings
+
+import numpy as np
+import pandas as pd
 
 import sunriset
 import sunriset.calc
+import sunriset.vcalc
+from sunriset import benchmark, cli, server
 
 class TestSunriset(unittest.TestCase):
     def test_to_pandas(self):
@@ -19,6 +33,19 @@ class TestSunriset(unittest.TestCase):
         df = sunriset.to_pandas(start_date, lat, long, local_tz, number_of_years)
 
         self.assertEqual(len(df.index), 365)
+        self.assertIsInstance(df.index, pd.DatetimeIndex)
+        self.assertEqual(str(df["Sunrise"].dtype), "timedelta64[ns]")
+        self.assertEqual(str(df["Solar Decline"].dtype), "float64")
+
+    def test_to_pandas_matches_to_dict(self):
+        start_date = datetime.date(2019, 1, 1)
+        df = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1)
+        rows = sunriset.to_dict(start_date, 34.0522, -118.2437, -8, 1)
+
+        self.assertEqual(df.loc["2019-03-01", "Sunrise"],
+                         rows[datetime.date(2019, 3, 1)][21])
+        self.assertAlmostEqual(df.loc["2019-03-01", "Solar Decline"],
+                               rows[datetime.date(2019, 3, 1)][13])
 
     def test_set_noon(self):
         lat = 34.0522
@@ -32,6 +59,1047 @@ class TestSunriset(unittest.TestCase):
                          (datetime.timedelta(seconds=25116, microseconds=873548),
                           datetime.timedelta(seconds=60871, microseconds=790164),
                           datetime.timedelta(seconds=42994, microseconds=331856)))
+    def test_columns(self):
+        start_date = datetime.date(2019, 1, 1)
+        df = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1,
+                                columns=["Sunrise", "Solar Decline"])
+        rows = sunriset.to_dict(start_date, 34.0522, -118.2437, -8, 1,
+                                columns=["Sunrise", "Solar Decline"])
+
+        self.assertEqual(list(df.columns), ["Sunrise", "Solar Decline"])
+        self.assertEqual(len(rows[start_date]), 2)
+        self.assertEqual(df.iloc[0]["Sunrise"], rows[start_date][0])
+        self.assertRaises(ValueError, sunriset.to_pandas, start_date,
+                          34.0522, -118.2437, -8, 1, columns=["Sunup"])
+
+    def test_to_dict_matches_calc(self):
+        start_date = datetime.date(2019, 1, 1)
+        rows = sunriset.to_dict(start_date, 34.0522, -118.2437, -8, 1)
+
+        for day in (start_date, datetime.date(2019, 6, 21), datetime.date(2019, 12, 31)):
+            row = rows[day]
+            expected = sunriset.sunrise_set_noon(day, 34.0522, -118.2437, -8)
+            self.assertEqual(len(row), len(sunriset.COLUMNS))
+            self.assertIsInstance(row[0], float)
+            for position, value in zip((21, 22, 20), expected):
+                self.assertIsInstance(row[position], datetime.timedelta)
+                self.assertLess(abs(row[position] - value),
+                                datetime.timedelta(milliseconds=1))
+
+    def test_column_positions(self):
+        # Positional consumers of to_dict rows rely on this order.
+        self.assertEqual(sunriset.COLUMNS.index("Sunrise"), 21)
+        self.assertEqual(sunriset.COLUMNS.index("Ture Solar Time"), 24)
+        self.assertEqual(sunriset.COLUMNS[-2],
+                         "Solar Azimuth Angle (degrees cw from North)")
+        self.assertEqual(sunriset.COLUMNS[-1], "Sun Status")
+
+    def test_resolve(self):
+        needed = sunriset.pipeline.resolve(["Sunrise"])
+
+        self.assertIn("Hour Angle Sunrise", needed)
+        self.assertNotIn("Solar Radius Vector AUs", needed)
+        self.assertNotIn("Solar Accent Return", needed)
+        self.assertLess(needed.index("Julian Day"), needed.index("Sunrise"))
+
+    def test_zone(self):
+        start_date = datetime.date(2019, 1, 1)
+        df = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1,
+                                zone="America/Los_Angeles")
+        rows = sunriset.to_dict(start_date, 34.0522, -118.2437, -8, 1,
+                                columns=["Sunrise"], zone="America/Los_Angeles")
+        winter, summer = df.loc["2019-01-01"], df.loc["2019-07-01"]
+
+        self.assertEqual(str(df["Sunrise"].dtype),
+                         "datetime64[ns, America/Los_Angeles]")
+        self.assertEqual(winter["Sunrise"].utcoffset(), datetime.timedelta(hours=-8))
+        self.assertEqual(summer["Sunrise"].utcoffset(), datetime.timedelta(hours=-7))
+        self.assertEqual(summer["Sunrise"].tz_localize(None),
+                         pd.Timestamp("2019-07-01") + pd.Timedelta(hours=1)
+                         + summer["Sunrise (float)"] * pd.Timedelta(days=1))
+        self.assertEqual(rows[datetime.date(2019, 7, 1)][0], summer["Sunrise"])
+
+
+class TestSites(unittest.TestCase):
+    def setUp(self):
+        self.start_date = datetime.date(2019, 1, 1)
+        self.lat = [34.0522, 40.7128, -33.8688]
+        self.long = [-118.2437, -74.0060, 151.2093]
+        self.local_tz = [-8, -5, 10]
+
+    def test_no_sites(self):
+        dates, values = sunriset.sites_to_arrays(self.start_date, [], [], [], 1,
+                                                 ["Sunrise", "Sun Status"])
+        df = sunriset.sites_to_pandas(self.start_date, [], [], [], 1, ["Sunrise"])
+
+        self.assertEqual(values["Sunrise"].shape, (0, 365))
+        self.assertEqual(values["Sunrise"].dtype, np.dtype("m8[ns]"))
+        self.assertEqual(values["Sun Status"].dtype, sunriset.vcalc.STATUS_DTYPE)
+        self.assertEqual(len(df), 0)
+        self.assertEqual(list(df.columns), ["Sunrise"])
+        self.assertRaises(ValueError, sunriset.sites_to_arrays, self.start_date,
+                          [], [], [], 1, ["Dawn"])
+
+    def test_sites_to_pandas_matches_to_pandas(self):
+        columns = ["Sunrise", "Sunset", "Solar Decline",
+                   "Solar Azimuth Angle (degrees cw from North)"]
+        df = sunriset.sites_to_pandas(self.start_date, self.lat, self.long,
+                                      self.local_tz, 1, columns=columns,
+                                      site_ids=["la", "ny", "syd"])
+
+        self.assertEqual(len(df.index), 3 * 365)
+        for site, lat, long, local_tz in zip(["la", "ny", "syd"], self.lat,
+                                             self.long, self.local_tz):
+            single = sunriset.to_pandas(self.start_date, lat, long, local_tz, 1,
+                                        columns=columns)
+            pd.testing.assert_frame_equal(df.loc[site], single,
+                                          check_names=False, check_freq=False)
+
+    def test_wide_layout(self):
+        wide = sunriset.sites_to_pandas(self.start_date, self.lat, self.long, -8, 1,
+                                        columns=["Sunrise"], layout="wide")
+
+        self.assertEqual(wide["Sunrise"].shape, (3, 365))
+        self.assertRaises(ValueError, sunriset.sites_to_pandas, self.start_date,
+                          self.lat, self.long, -8, 1, layout="tall")
+
+    def test_workers(self):
+        columns = ["Sunrise", "Solar Decline"]
+        dates, serial = sunriset.sites_to_arrays(self.start_date, self.lat, self.long,
+                                                 self.local_tz, 1, columns)
+        _, parallel = sunriset.sites_to_arrays(self.start_date, self.lat, self.long,
+                                               self.local_tz, 1, columns, workers=2)
+
+        for name in columns:
+            np.testing.assert_array_equal(parallel[name], serial[name])
+
+
+class TestSolarPosition(unittest.TestCase):
+    def test_noon_matches_to_pandas(self):
+        start_date = datetime.date(2019, 1, 1)
+        df = sunriset.solar_position(start_date, 34.0522, -118.2437, -8, 1,
+                                     freq="5min")
+        daily = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1)
+
+        self.assertEqual(len(df.index), 365 * 288)
+        for name in df.columns:
+            np.testing.assert_allclose(df.at_time("12:00")[name].values,
+                                       daily[name].values, atol=1e-9)
+
+    def test_time_offsets(self):
+        offsets = sunriset.timeseries.time_offsets("6h")
+
+        self.assertEqual(list(offsets // (3600 * 10**9)), [0, 6, 12, 18])
+        for freq in ("0min", "-5min"):
+            self.assertRaises(ValueError, sunriset.timeseries.time_offsets, freq)
+            self.assertRaises(ValueError, sunriset.window.time_grid, freq)
+            self.assertRaises(ValueError, sunriset.orientation.sweep,
+                              datetime.date(2019, 1, 1), 0.0, 0.0, 0, 1, freq=freq)
+
+    def test_true_solar_time_min(self):
+        self.assertEqual(sunriset.calc.true_solar_time_min(0, 0, 0), 720)
+        self.assertEqual(sunriset.calc.true_solar_time_min(0, 0, 0, 0.25), 360)
+
+
+class TestEphemerisCache(unittest.TestCase):
+    def setUp(self):
+        sunriset.ephemeris.cache_clear()
+
+    def tearDown(self):
+        sunriset.ephemeris.set_cache_size(1024, sunriset.ephemeris.MAXBYTES)
+        sunriset.ephemeris.cache_clear()
+
+    def test_same_day_hits(self):
+        date = datetime.date(2019, 1, 1)
+        first = sunriset.sunrise_set_noon(date, 34.0522, -118.2437, -8)
+        second = sunriset.sunrise_set_noon(date, 40.7128, -118.2437, -8)
+
+        self.assertEqual(sunriset.ephemeris.cache_info(),
+                         sunriset.ephemeris.CacheInfo(1, 1, 1024, 1))
+        self.assertEqual(first[2], second[2])
+        self.assertNotEqual(first[0], second[0])
+
+    def test_lru_eviction(self):
+        sunriset.ephemeris.set_cache_size(2)
+        for day in (1, 2, 1, 3, 1, 2):
+            sunriset.ephemeris.day(datetime.date(2019, 1, day), -8)
+
+        self.assertEqual(sunriset.ephemeris.cache_info(),
+                         sunriset.ephemeris.CacheInfo(2, 4, 2, 2))
+
+    def test_to_dict_one_entry(self):
+        date = datetime.date(2019, 1, 1)
+        sunriset.sunrise_set_noon(date, 34.0522, -118.2437, -8)
+        for _ in range(2):
+            sunriset.to_dict(date, 34.0522, -118.2437, -8, 5)
+        sunriset.sunrise_set_noon(date, 34.0522, -118.2437, -8)
+
+        self.assertEqual(sunriset.ephemeris.cache_info(),
+                         sunriset.ephemeris.CacheInfo(2, 2, 1024, 2))
+
+    def test_days_not_consecutive(self):
+        sunriset.ephemeris.days(pd.date_range("2019-01-01", periods=2), -8)
+        dates = pd.DatetimeIndex(["2019-01-01", "2019-06-21"])
+        values = sunriset.sites.evaluate_sites(dates, 34.0522, -118.2437, -8,
+                                               ["Solar Decline"])
+
+        self.assertAlmostEqual(values["Solar Decline"][0, 1], 23.44, places=2)
+        self.assertEqual(sunriset.ephemeris.cache_info().currsize, 1)
+
+    def test_bytes_bound(self):
+        start_date = datetime.date(2000, 1, 1)
+        day_bytes = 8 * len(sunriset.pipeline.EPHEMERIS)
+        sunriset.ephemeris.set_cache_size(1024, maxbytes=400 * day_bytes)
+        sunriset.ephemeris.days(sunriset.date_range(start_date, 1), -8)
+        self.assertEqual(sunriset.ephemeris.cache_nbytes(), 366 * day_bytes)
+
+        # A range too large for the cache on its own is not kept, and one that
+        # fits evicts the oldest entries to make room.
+        sunriset.ephemeris.days(sunriset.date_range(start_date, 2), -8)
+        self.assertEqual(sunriset.ephemeris.cache_info().currsize, 1)
+        sunriset.ephemeris.days(sunriset.date_range(start_date, 1), -7)
+        self.assertEqual(sunriset.ephemeris.cache_info().currsize, 1)
+        self.assertEqual(sunriset.ephemeris.cache_nbytes(), 366 * day_bytes)
+        for day in range(1, 40):
+            sunriset.ephemeris.day(datetime.date(2019, 1, day % 31 + 1), -8)
+        self.assertLessEqual(sunriset.ephemeris.cache_nbytes(), 400 * day_bytes)
+
+    def test_disabled(self):
+        sunriset.ephemeris.set_cache_size(0)
+        sunriset.to_pandas(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8, 1)
+        sunriset.to_pandas(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8, 1)
+
+        self.assertEqual(sunriset.ephemeris.cache_info().currsize, 0)
+        self.assertEqual(sunriset.ephemeris.cache_info().misses, 2)
+
+
+class TestEphemerisTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "ephemeris.npy")
+        sunriset.table.build_table(cls.path, 1990, 2010)
+
+    @classmethod
+    def tearDownClass(cls):
+        sunriset.table.unload()
+        sunriset.ephemeris.cache_clear()
+        cls.directory.cleanup()
+
+    def test_accuracy(self):
+        ephemeris_table = sunriset.table.EphemerisTable(self.path)
+        julian_day = np.concatenate([
+            np.random.default_rng(0).uniform(2447893, 2455562, 20000),
+            np.linspace(2451542, 2451548, 2001),  # 2000 Jan 1, julian_century restarts
+        ])
+        result = ephemeris_table.lookup(julian_day)
+        direct = sunriset.pipeline.evaluate(sunriset.vcalc, sunriset.table.TABLE_COLUMNS,
+                                            known={"Julian Day": julian_day})
+
+        np.testing.assert_allclose(result["Solar Decline"], direct["Solar Decline"],
+                                   rtol=0, atol=1e-5)
+        np.testing.assert_allclose(result["Equation Of Time Min"],
+                                   direct["Equation Of Time Min"], rtol=0, atol=2e-5)
+        np.testing.assert_allclose(result["Solar Radius Vector AUs"],
+                                   direct["Solar Radius Vector AUs"], rtol=0, atol=1e-8)
+        self.assertRaises(ValueError, ephemeris_table.lookup, 2460000.0)
+
+    def test_to_pandas_uses_table(self):
+        start_date = datetime.date(2005, 1, 1)
+        direct = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1, ["Sunrise"])
+        sunriset.ephemeris.cache_clear()
+        sunriset.table.load(self.path)
+        try:
+            result = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1,
+                                        ["Sunrise"])
+        finally:
+            sunriset.table.unload()
+        difference = (result["Sunrise"] - direct["Sunrise"]).abs().max()
+
+        self.assertLess(difference, pd.Timedelta(milliseconds=5))
+        self.assertEqual(sunriset.ephemeris.cache_info().currsize, 1)
+
+
+    def test_outside_the_table(self):
+        site = (34.0522, -118.2437, -8)
+        times = pd.date_range("2010-12-30", "2011-01-03", freq="6h")
+        starts = [datetime.date(2010, 12, 1), datetime.date(2012, 1, 1)]
+        direct = [sunriset.to_pandas(start, *site, 1, ["Sunrise"]) for start in starts]
+        expected_events = sunriset.twilight(starts[0], *site, 1)
+        expected_position = sunriset.sun_position(times, *site[:2])
+        sunriset.ephemeris.cache_clear()
+        sunriset.table.load(self.path)
+        try:
+            results = [sunriset.to_pandas(start, *site, 1, ["Sunrise"])
+                       for start in starts]
+            events = sunriset.twilight(starts[0], *site, 1)
+            position = sunriset.sun_position(times, *site[:2])
+        finally:
+            sunriset.table.unload()
+            sunriset.ephemeris.cache_clear()
+
+        for result, expected in zip(results, direct):
+            difference = (result["Sunrise"] - expected["Sunrise"]).abs().max()
+            self.assertLess(difference, pd.Timedelta(milliseconds=5))
+        # Past the table the values are the direct ones.
+        pd.testing.assert_frame_equal(results[1], direct[1])
+        difference = (events - expected_events).abs().max().max()
+        self.assertLess(difference, pd.Timedelta(milliseconds=5))
+        np.testing.assert_allclose(position.values, expected_position.values,
+                                   atol=1e-4)
+
+class TestRecords(unittest.TestCase):
+    def test_matches_solar_position(self):
+        daily = sunriset.solar_position(datetime.date(2019, 6, 1), 34.0522, -118.2437,
+                                        0, 1, freq="30min")
+        sample = daily.at_time("12:00")
+        result = sunriset.sun_position(sample.index, 34.0522, -118.2437)
+
+        for name in daily.columns:
+            np.testing.assert_allclose(result[name].values, sample[name].values,
+                                       atol=0.002)
+
+    def test_annotate(self):
+        frame = pd.DataFrame({
+            "timestamp": pd.to_datetime(["2019-01-01 12:00", "1990-07-01 04:00"])
+            .tz_localize("America/Los_Angeles"),
+            "lat": [34.0522, 34.0522],
+            "long": [-118.2437, -118.2437],
+        })
+        result = sunriset.annotate(frame)
+        daily = sunriset.to_pandas(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8, 1)
+
+        self.assertEqual(len(result.columns), 6)
+        self.assertAlmostEqual(result["Solar Elevation Angle (degrees)"][0],
+                               daily["Solar Elevation Angle (degrees)"].iloc[0],
+                               places=2)
+        self.assertLess(result["Solar Elevation Angle (degrees)"][1], 0)
+
+
+class TestStream(unittest.TestCase):
+    def test_batches_match_to_pandas(self):
+        start_date = datetime.date(2019, 1, 1)
+        columns = ["Sunrise", "Solar Decline"]
+        batches = list(sunriset.iter_batches(start_date, 34.0522, -118.2437, -8, 2,
+                                             columns, batch_days=100))
+        frames = list(sunriset.iter_batches(start_date, 34.0522, -118.2437, -8, 2,
+                                            columns, batch_days=100, as_frame=True))
+        expected = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 2, columns)
+
+        self.assertEqual([len(b) for b in batches], [100] * 7 + [30])
+        records = np.concatenate(batches)
+        np.testing.assert_array_equal(records["Date"], expected.index.values)
+        np.testing.assert_array_equal(records["Sunrise"], expected["Sunrise"].values)
+        pd.testing.assert_frame_equal(pd.concat(frames), expected, check_freq=False)
+
+    def test_sites(self):
+        batches = list(sunriset.iter_batches(datetime.date(2019, 1, 1), [34.0, 40.0],
+                                             [-118.0, -74.0], [-8, -5], 1,
+                                             ["Sunset"], batch_days=200))
+
+        self.assertEqual(batches[0].dtype.names, ("Site", "Date", "Sunset"))
+        self.assertEqual(len(batches[0]), 400)
+        self.assertEqual(list(batches[1]["Site"][[0, -1]]), [0, 1])
+
+
+class TestResults(unittest.TestCase):
+    def test_solar_day(self):
+        date = datetime.date(2019, 1, 1)
+        day = sunriset.solar_day(date, 34.0522, -118.2437, -8)
+        rise, sset, noon = sunriset.sunrise_set_noon(date, 34.0522, -118.2437, -8)
+
+        self.assertEqual((day.sunrise, day.sunset, day.solar_noon), (rise, sset, noon))
+        self.assertEqual(day.as_dict()["Solar Decline"], day.solar_decline)
+        self.assertFalse(hasattr(day, "__dict__"))
+        with self.assertRaises(AttributeError):
+            day.unknown = 1
+
+    def test_solar_day_columns(self):
+        day = sunriset.solar_day(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8,
+                                 columns=["Sunset"])
+
+        self.assertEqual(list(day.as_dict()), ["Sunset"])
+        self.assertIsNone(day.solar_decline)
+
+    def test_to_array(self):
+        start_date = datetime.date(2019, 1, 1)
+        columns = ["Sunrise", "Solar Decline"]
+        records = sunriset.to_array(start_date, 34.0522, -118.2437, -8, 1, columns)
+        expected = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1, columns)
+
+        self.assertEqual(records.dtype.names, ("Date", "Sunrise", "Solar Decline"))
+        np.testing.assert_array_equal(records["Date"], expected.index.values)
+        np.testing.assert_array_equal(records["Sunrise"], expected["Sunrise"].values)
+
+
+class TestEvents(unittest.TestCase):
+    def test_closed_form_matches_sunrise(self):
+        start_date = datetime.date(2019, 1, 1)
+        frame = sunriset.twilight(start_date, 34.0522, -118.2437, -8, 1,
+                                  {"Sunrise": 90.833}, iterations=0)
+        expected = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 1,
+                                      ["Sunrise", "Sunset"])
+
+        np.testing.assert_array_equal(frame["Sunrise Rising"].values,
+                                      expected["Sunrise"].values)
+        np.testing.assert_array_equal(frame["Sunrise Setting"].values,
+                                      expected["Sunset"].values)
+
+    def test_refined_crossings(self):
+        lat, long, local_tz = 34.0522, -118.2437, -8
+        zeniths = np.array([90.833, 96, 102, 108])
+        dates = sunriset.date_range(datetime.date(2019, 1, 1), 1)
+        times = sunriset.events.crossings(dates, lat, long, local_tz, zeniths)
+
+        for event in ("Rising", "Setting"):
+            time = times[event]
+            at = sunriset.ephemeris.at(sunriset.vcalc.julian_day(dates, local_tz)
+                                       - 0.5 + time)
+            true_solar_time = sunriset.vcalc.true_solar_time_min(
+                at["Equation Of Time Min"], long, local_tz, time)
+            zenith = sunriset.vcalc.solar_zenith_angle(
+                lat, at["Solar Decline"],
+                sunriset.vcalc.hour_angle_deg(true_solar_time))
+            np.testing.assert_allclose(zenith, zeniths[:, None] + 0 * time, atol=1e-5)
+        self.assertTrue((times["Rising"][1] < times["Rising"][0]).all())
+
+    def test_high_latitude_twilight(self):
+        # At 60N astronomical twilight ends around 2019-04-21, near midnight.
+        lat, long, local_tz = 60, 10, 1
+        zeniths = np.array([102, 108])
+        dates = pd.date_range("2019-04-17", periods=8, freq="D")
+        times = sunriset.events.crossings(dates, lat, long, local_tz, zeniths)
+
+        for event in ("Rising", "Setting"):
+            time = times[event]
+            at = sunriset.ephemeris.at(sunriset.vcalc.julian_day(dates, local_tz)
+                                       - 0.5 + np.nan_to_num(time))
+            true_solar_time = sunriset.vcalc.true_solar_time_min(
+                at["Equation Of Time Min"], long, local_tz, time)
+            zenith = sunriset.vcalc.solar_zenith_angle(
+                lat, at["Solar Decline"],
+                sunriset.vcalc.hour_angle_deg(true_solar_time))
+            np.testing.assert_allclose(zenith, zeniths[:, None] + 0 * time, atol=1e-6)
+        self.assertFalse(np.isnan(times["Setting"][0]).any())
+        # The sun stays above 108 degrees the night of the 21st.
+        self.assertTrue(np.isnan(times["Setting"][1][4:]).all())
+        self.assertFalse(np.isnan(times["Setting"][1][:4]).any())
+
+    def test_no_crossing(self):
+        frame = sunriset.twilight(datetime.date(2019, 6, 1), 70, 20, 1, 1, [96])
+
+        self.assertEqual(list(frame.columns), ["96 Rising", "96 Setting"])
+        self.assertTrue(frame.loc["2019-06-21"].isna().all())
+        self.assertFalse(frame.loc["2019-12-21"].isna().any())
+
+
+class TestEventIndex(unittest.TestCase):
+    def test_next_and_previous(self):
+        index = sunriset.EventIndex(34.0522, -118.2437, -8, datetime.date(2019, 1, 1),
+                                    days=30)
+        rise, sset, noon = sunriset.sunrise_set_noon(datetime.date(2019, 1, 10),
+                                                     34.0522, -118.2437, -8)
+        # 04:00 local standard time.
+        t = datetime.datetime(2019, 1, 10, 12)
+        midnight = pd.Timestamp("2019-01-10 08:00", tz="UTC")
+
+        time, event = index.next(t)
+        self.assertEqual(event, "Sunrise")
+        self.assertLess(abs(time - (midnight + rise)), pd.Timedelta("1us"))
+        time, event = index.next(t, "Sunset")
+        self.assertLess(abs(time - (midnight + sset)), pd.Timedelta("1us"))
+        self.assertEqual(index.previous(t)[1], "Sunset")
+        time, event = index.next(t, "Solar Noon")
+        self.assertLess(abs(time - (midnight + noon)), pd.Timedelta("1us"))
+        self.assertEqual(index.previous(time), (time, "Solar Noon"))
+        with self.assertRaises(ValueError):
+            index.next(t, "Dusk")
+
+    def test_extends(self):
+        index = sunriset.EventIndex(34.0522, -118.2437, -8, datetime.date(2019, 1, 1),
+                                    days=10)
+        times, events = index.next(pd.DatetimeIndex(["2019-03-01", "2018-12-01"]))
+
+        self.assertEqual(list(events), ["Sunset", "Sunset"])
+        self.assertEqual(index.first_date, datetime.date(2018, 11, 22))
+        self.assertEqual(index.last_date, datetime.date(2019, 3, 2))
+        self.assertEqual(len(index), 3 * (index.last_date - index.first_date).days)
+
+    def test_is_daylight(self):
+        times = pd.date_range("2019-01-01", periods=365 * 24, freq="h")
+        for lat, long, local_tz in [(34.0522, -118.2437, -8), (78.2, 15.6, 1)]:
+            index = sunriset.EventIndex(lat, long, local_tz, datetime.date(2019, 1, 1))
+            elevation = sunriset.sun_position(times, lat, long).iloc[:, 0]
+            daylight = index.is_daylight(times)
+            # Only hours within minutes of sunrise or sunset may differ.
+            self.assertLess((daylight != (elevation > -0.833)).sum(), 20)
+        self.assertTrue(index.is_daylight(datetime.datetime(2019, 6, 21)))
+        self.assertFalse(index.is_daylight(datetime.datetime(2019, 12, 21, 12)))
+
+    def test_nat(self):
+        index = sunriset.EventIndex(34.0522, -118.2437, -8, datetime.date(2019, 1, 1),
+                                    days=10)
+        times, events = index.next(pd.DatetimeIndex(["2019-01-05", pd.NaT]))
+
+        self.assertEqual(events[0], "Sunset")
+        self.assertIs(times[1], pd.NaT)
+        self.assertIsNone(events[1])
+        self.assertEqual(index.previous(pd.NaT), (pd.NaT, None))
+        self.assertFalse(index.is_daylight(pd.NaT))
+        self.assertEqual(len(index), 30)
+
+
+class TestServer(unittest.TestCase):
+    def test_coalesces_and_batches(self):
+        service = server.SolarService()
+        date = datetime.date(2019, 1, 1)
+        sites = [(34.0522, -118.2437, -8), (40.7128, -74.006, -5)] * 50
+
+        async def requests():
+            return await asyncio.gather(
+                *(service.sunrise_set_noon(date, *site) for site in sites))
+
+        results = asyncio.run(requests())
+        for site, result in zip(sites, results):
+            self.assertEqual(result, sunriset.sunrise_set_noon(date, *site))
+        metrics = service.metrics.snapshot()
+        self.assertEqual((metrics["computed"], metrics["batches"]), (2, 1))
+        self.assertEqual(metrics["coalesced"], 98)
+
+        asyncio.run(requests())
+        self.assertEqual(service.metrics.snapshot()["cache_hits"], 100)
+
+    def test_http(self):
+        async def get(target):
+            srv = await server.serve(port=0)
+            port = srv.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write("GET {} HTTP/1.1\r\nConnection: close\r\n\r\n"
+                         .format(target).encode())
+            response = await reader.read()
+            writer.close()
+            srv.close()
+            await srv.wait_closed()
+            head, _, body = response.partition(b"\r\n\r\n")
+            return head.split()[1], json.loads(body)
+
+        status, body = asyncio.run(get(
+            "/sunrise_set_noon?date=2019-01-01&lat=34.0522&long=-118.2437&local_tz=-8"))
+        self.assertEqual(status, b"200")
+        self.assertEqual(body["sunrise"], "6:58:36.873548")
+        self.assertEqual(asyncio.run(get("/sunrise_set_noon?date=2019-01-01"))[0],
+                         b"400")
+        self.assertEqual(asyncio.run(get("/metrics"))[1]["requests"], 0)
+
+        with unittest.mock.patch.object(server, "compute_batch",
+                                        side_effect=RuntimeError("failed")):
+            status, body = asyncio.run(get(
+                "/sunrise_set_noon?date=2019-01-01&lat=0&long=0&local_tz=0"))
+        self.assertEqual(status, b"500")
+        self.assertEqual(body["error"], "internal error: failed")
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_parquet(self):
+        import pyarrow.parquet
+
+        path = os.path.join(self.directory.name, "la.parquet")
+        start_date = datetime.date(2019, 1, 1)
+        sunriset.to_parquet(path, start_date, 34.0522, -118.2437, -8, 2,
+                            columns=["Sunrise", "Solar Decline", "Julian Day"],
+                            batch_days=50, float32=True)
+        table = pyarrow.parquet.read_table(path)
+        expected = sunriset.to_pandas(start_date, 34.0522, -118.2437, -8, 2,
+                                      ["Sunrise", "Solar Decline", "Julian Day"])
+
+        self.assertEqual(str(table.schema.field("Sunrise").type), "duration[ns]")
+        self.assertEqual(str(table.schema.field("Solar Decline").type), "float")
+        self.assertEqual(str(table.schema.field("Julian Day").type), "double")
+        np.testing.assert_array_equal(table.column("Julian Day").to_numpy(),
+                                      expected["Julian Day"].values)
+        np.testing.assert_array_equal(table.column("Sunrise").to_numpy(),
+                                      expected["Sunrise"].values)
+
+    def test_partitions(self):
+        import pyarrow.ipc
+
+        path = os.path.join(self.directory.name, "sites")
+        sunriset.to_arrow(path, datetime.date(2019, 1, 1), [34.0, 40.0],
+                          [-118.0, -74.0], [-8, -5], 2, columns=["Sunset"],
+                          partition_by=("site", "year"), site_ids=["la", "ny"])
+        table = pyarrow.ipc.open_file(
+            os.path.join(path, "site=ny", "year=2019", "part-0.arrow")).read_all()
+
+        self.assertEqual(len(os.listdir(path)), 2)
+        self.assertEqual(table.num_rows, 365)
+        self.assertEqual(table.schema.names, ["Date", "Sunset"])
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.sites = os.path.join(self.directory.name, "sites.csv")
+        pd.DataFrame({"id": ["la", "ny", "sea"], "lat": [34.0522, 40.7128, 47.6],
+                      "long": [-118.2437, -74.006, -122.3], "tz": [-8, -5, -8]}
+                     ).to_csv(self.sites, index=False)
+        self.expected = sunriset.sites_to_pandas(
+            datetime.date(2019, 1, 1), [34.0522, 40.7128, 47.6],
+            [-118.2437, -74.006, -122.3], [-8, -5, -8], 1, ["Sunrise", "Solar Decline"],
+            site_ids=["la", "ny", "sea"])
+
+    def test_parquet(self):
+        output = os.path.join(self.directory.name, "out.parquet")
+        status = cli.main([self.sites, "-o", output, "--start", "2019-01-01",
+                           "--columns", "Sunrise,Solar Decline", "--chunk-size", "2",
+                           "--batch-days", "100", "--workers", "2"])
+        frame = pd.read_parquet(output).set_index(["Site", "Date"]).sort_index()
+
+        self.assertEqual(status, 0)
+        np.testing.assert_array_equal(frame["Sunrise"].values,
+                                      self.expected["Sunrise"].values)
+
+    def test_csv(self):
+        output = os.path.join(self.directory.name, "out.csv")
+        rows = cli.run(self.sites, output, datetime.date(2019, 1, 1), 1,
+                       columns=["Sunrise", "Solar Decline"], chunk_size=2)
+        frame = pd.read_csv(output, parse_dates=["Date"]).set_index(["Site", "Date"])
+
+        self.assertEqual(rows, 3 * 365)
+        np.testing.assert_array_equal(pd.to_timedelta(frame["Sunrise"]).values,
+                                      self.expected["Sunrise"].values)
+        np.testing.assert_allclose(frame["Solar Decline"].values,
+                                   self.expected["Solar Decline"].values)
+
+    def test_string_ids(self):
+        sites = os.path.join(self.directory.name, "ids.csv")
+        ids = ["007", "8", "x"]
+        pd.DataFrame({"id": ids, "lat": [34.0] * 3, "long": [-118.0] * 3,
+                      "tz": [-8] * 3}).to_csv(sites, index=False)
+        for output in ("out.csv", "out.parquet"):
+            output = os.path.join(self.directory.name, output)
+            cli.run(sites, output, datetime.date(2019, 1, 1), 1, columns=["Sunrise"],
+                    chunk_size=2)
+            if output.endswith(".csv"):
+                frame = pd.read_csv(output, dtype={"Site": str})
+            else:
+                frame = pd.read_parquet(output)
+            self.assertEqual(list(frame["Site"].unique()), ids)
+        parquet = os.path.join(self.directory.name, "ids.parquet")
+        pd.DataFrame({"id": [7, 8], "lat": [34.0] * 2, "long": [-118.0] * 2,
+                      "tz": [-8] * 2}).to_parquet(parquet)
+        cli.run(parquet, output, datetime.date(2019, 1, 1), 1, columns=["Sunrise"])
+        self.assertEqual(list(pd.read_parquet(output)["Site"].unique()), ["7", "8"])
+
+    def test_unknown_column(self):
+        output = os.path.join(self.directory.name, "out.csv")
+        with unittest.mock.patch("sys.stderr"):
+            status = cli.main([self.sites, "-o", output, "--columns", "Dawn"])
+        self.assertEqual(status, 1)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            report = benchmark.run(path, quick=True, match="calc.julian_day", repeat=1,
+                                   out=io.StringIO())
+            with open(path) as fh:
+                saved = json.load(fh)
+
+        self.assertEqual(list(report["results"]), ["calc.julian_day"])
+        self.assertEqual(saved["results"], report["results"])
+        self.assertGreater(report["results"]["calc.julian_day"]["throughput"], 0)
+
+    def test_compare(self):
+        def report(throughput, peak_bytes):
+            return {"results": {"case": {"throughput": throughput,
+                                         "peak_bytes": peak_bytes}}}
+
+        base = report(100.0, 10 * 2**20)
+        self.assertFalse(benchmark.compare(base, report(95.0, 10 * 2**20))[0][3])
+        self.assertTrue(benchmark.compare(base, report(80.0, 10 * 2**20))[0][3])
+        self.assertTrue(benchmark.compare(base, report(100.0, 20 * 2**20))[0][3])
+        # Small allocations are not flagged whatever the ratio.
+        self.assertFalse(benchmark.compare(report(100.0, 10), report(100.0, 1000))[0][3])
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_stages(self):
+        events = []
+        with sunriset.instrument(callback=lambda *event: events.append(event)) as r:
+            sunriset.to_dict(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8, 1,
+                             ["Sunrise"])
+        stats = r.stats()
+
+        self.assertEqual(stats["vcalc.make_time"].calls, 1)
+        self.assertEqual(stats["ephemeris"].calls, 1)
+        self.assertNotIn("vcalc.solar_azimuth", stats)
+        self.assertEqual(len(events), sum(s.calls for s in stats.values()))
+        self.assertEqual(json.loads(r.to_json())["rows"]["calls"], 1)
+
+    def test_allocations(self):
+        with sunriset.instrument(allocations=True) as recorder:
+            sunriset.to_pandas(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8, 1)
+        frame = recorder.as_frame()
+
+        self.assertEqual(frame.loc["frame", "calls"], 1)
+        self.assertGreater(frame.loc["vcalc.make_time", "allocated"], 3 * 365 * 8)
+
+    def test_disabled(self):
+        with sunriset.instrument() as recorder:
+            pass
+        sunriset.sunrise_set_noon(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8)
+
+        self.assertEqual(recorder.stats(), {})
+        self.assertIsNone(sunriset.instrumentation.active())
+
+    def test_threads(self):
+        active = []
+
+        def run():
+            active.append(sunriset.instrumentation.active())
+            sunriset.to_dict(datetime.date(2019, 1, 1), 34.0522, -118.2437, -8, 1,
+                             ["Sunrise"])
+
+        with sunriset.instrument() as recorder:
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(active, [None])
+        self.assertEqual(recorder.stats(), {})
+
+
+class TestRaster(unittest.TestCase):
+    def test_matches_sites(self):
+        date = datetime.date(2019, 6, 21)
+        lat, long = sunriset.raster.grid(5)
+        local_tz = sunriset.raster.nominal_tz(long)
+        site_lat, site_long = (a.ravel() for a in np.meshgrid(lat, long, indexing="ij"))
+        dates = sunriset.date_range(date, 1)[:1]
+        columns = list(sunriset.raster.RASTER_COLUMNS)
+        with np.errstate(invalid="ignore"):
+            expected = sunriset.sites.evaluate_sites(dates, site_lat, site_long,
+                                                     np.round(site_long / 15), columns)
+
+        self.assertEqual((len(lat), len(long)), (36, 72))
+        for name in columns:
+            values = sunriset.raster.raster(date, lat, long, name, local_tz)
+            np.testing.assert_allclose(values.ravel(), expected[name][:, 0],
+                                       rtol=1e-12, atol=1e-12)
+        self.assertTrue(np.isnan(values[0]).all())
+
+    def test_out(self):
+        lat, long = sunriset.raster.grid(1)
+        out = np.empty((180, 360), dtype=np.float32)
+        result = sunriset.raster.raster(datetime.date(2019, 1, 1), lat, long,
+                                        "Sunset (float)", out=out)
+
+        self.assertIs(result, out)
+        with self.assertRaises(ValueError):
+            sunriset.raster.raster(datetime.date(2019, 1, 1), lat, long,
+                                   "Sunset (float)", out=out[1:])
+
+
+class TestSnap(unittest.TestCase):
+    def setUp(self):
+        self.date = datetime.date(2019, 1, 1)
+
+    def test_cell_centre(self):
+        cache = sunriset.SnappedCache(tolerance=0.01)
+        result = cache.sunrise_set_noon(self.date, 34.0522, -118.2437, -8)
+
+        self.assertEqual(cache.snap(34.0522, -118.2437), (34.05, -118.24))
+        expected = sunriset.sunrise_set_noon(self.date, 34.05, -118.24, -8)
+        self.assertEqual(result, expected)
+        self.assertIs(cache.sunrise_set_noon(self.date, 34.0498, -118.2372, -8), result)
+        self.assertEqual(cache.info()[:2], (1, 1))
+        self.assertEqual(cache.hit_rate(), 0.5)
+
+    def test_keys_and_eviction(self):
+        cache = sunriset.SnappedCache(tolerance=0.01, maxsize=2)
+        cache.sunrise_set_noon(self.date, 34.05, -118.24, -8)
+        cache.sunrise_set_noon(self.date, 34.05, -118.24, -7)
+        next_day = self.date + datetime.timedelta(days=1)
+        cache.sunrise_set_noon(next_day, 34.05, -118.24, -8)
+
+        self.assertEqual(cache.info()[1:], (3, 2, 2))
+        cache.clear()
+        self.assertEqual(cache.hit_rate(), 0.0)
+        with self.assertRaises(ValueError):
+            sunriset.SnappedCache(tolerance=0)
+
+    def test_error_bound(self):
+        cache = sunriset.SnappedCache(tolerance=0.1)
+        dates = [datetime.date(2019, month, 1) for month in range(1, 13)]
+        for lat, long in [(0.04, 10.04), (44.96, -93.04), (59.95, 10.75)]:
+            bound = datetime.timedelta(seconds=float(cache.error_bound(lat)))
+            for date in dates:
+                exact = sunriset.sunrise_set_noon(date, lat, long, 1)
+                snapped = cache.sunrise_set_noon(date, lat, long, 1)
+                for e, s in zip(exact, snapped):
+                    self.assertLessEqual(abs(e - s), bound)
+
+
+class TestPolar(unittest.TestCase):
+    def setUp(self):
+        # Longyearbyen, Svalbard: polar night in January, polar day in June.
+        self.site = (78.22, 15.65, 1)
+        self.start_date = datetime.date(2019, 1, 1)
+
+    def test_to_pandas(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            df = sunriset.to_pandas(self.start_date, *self.site, 1)
+
+        status = df["Sun Status"]
+        self.assertEqual(status["2019-01-01"], "polar night")
+        self.assertEqual(status["2019-06-21"], "polar day")
+        self.assertEqual(status["2019-03-21"], "")
+        polar = status != ""
+        self.assertTrue(df.loc[polar, "Sunrise"].isna().all())
+        self.assertTrue(df.loc[polar, "Sunlight Durration (minutes)"].isna().all())
+        self.assertFalse(df.loc[~polar, "Sunset"].isna().any())
+        self.assertFalse(df["Solar Noon"].isna().any())
+
+    def test_to_dict_matches_to_pandas(self):
+        columns = ["Sunrise", "Sunset (float)", "Sun Status"]
+        rows = sunriset.to_dict(self.start_date, *self.site, 1, columns)
+        df = sunriset.to_pandas(self.start_date, *self.site, 1, columns)
+
+        self.assertEqual(rows[datetime.date(2019, 1, 1)][0], None)
+        self.assertTrue(math.isnan(rows[datetime.date(2019, 6, 21)][1]))
+        self.assertEqual([row[2] for row in rows.values()], list(df["Sun Status"]))
+        self.assertEqual(sunriset.sunrise_set_noon(self.start_date, *self.site)[:2],
+                         (None, None))
+
+    def test_to_dict_zone(self):
+        rows = sunriset.to_dict(self.start_date, *self.site, 1,
+                                ["Sunrise", "Sunset", "Solar Noon"], zone="Europe/Oslo")
+
+        self.assertEqual(rows[datetime.date(2019, 1, 1)][:2], [None, None])
+        self.assertEqual(rows[datetime.date(2019, 6, 21)][:2], [None, None])
+        self.assertIsInstance(rows[datetime.date(2019, 1, 1)][2], datetime.datetime)
+        self.assertIsInstance(rows[datetime.date(2019, 3, 21)][0], datetime.datetime)
+
+    def test_poles(self):
+        for lat, status in [(90.0, "polar night"), (-90.0, "polar day")]:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                rows = sunriset.to_dict(self.start_date, lat, 0.0, 0, 1)
+                df = sunriset.to_pandas(self.start_date, lat, 0.0, 0, 1)
+            day = sunriset.solar_day(self.start_date, lat, 0.0, 0)
+
+            self.assertEqual(day.sun_status, status)
+            self.assertEqual(df["Sun Status"].iloc[0], status)
+            self.assertEqual(len(rows), 365)
+            # At a pole the sun is as high as its declination all day.
+            self.assertAlmostEqual(day.solar_zenith_angle,
+                                   90 - day.solar_decline * lat / 90)
+        self.assertTrue(math.isnan(day.solar_azimuth))
+        self.assertTrue(math.isnan(sunriset.calc.solar_zenith_angle(0.0, 0.0, math.nan)))
+
+    def test_poles_azimuth(self):
+        column = "Solar Azimuth Angle (degrees cw from North)"
+        for date in (datetime.date(2019, 6, 21), datetime.date(2019, 12, 21)):
+            for lat in (90.0, -90.0):
+                day = sunriset.solar_day(date, lat, 0.0, 0)
+                df = sunriset.to_pandas(date, lat, 0.0, 0, 1, [column])
+
+                self.assertTrue(math.isnan(day.solar_azimuth))
+                self.assertTrue(math.isnan(df[column].iloc[0]))
+
+    def test_sites(self):
+        lat, long, local_tz = [78.22, -77.85, 0.0], [15.65, 166.67, 0.0], [1, 12, 0]
+        _, values = sunriset.sites_to_arrays(self.start_date, lat, long, local_tz, 1,
+                                             ["Sunrise", "Sun Status"])
+
+        self.assertEqual(list(values["Sun Status"][:, 0]),
+                         ["polar night", "polar day", ""])
+        self.assertTrue(np.isnat(values["Sunrise"][:2, 0]).all())
+        day = sunriset.solar_day(self.start_date, *self.site)
+        self.assertEqual(day.sun_status, "polar night")
+        self.assertIsNone(day.as_dict()["Sunrise"])
+        self.assertEqual(len(day.as_dict()), len(sunriset.COLUMNS))
+        self.assertEqual(day, sunriset.solar_day(self.start_date, *self.site))
+
+
+class TestInsolation(unittest.TestCase):
+    def setUp(self):
+        self.lat = np.array([-77.85, -33.87, 0.0, 34.05, 51.5, 78.22])[:, np.newaxis]
+        self.decline = np.array([-23.44, -10.0, 0.0, 12.5, 23.44])
+
+    def _integral(self, irradiance):
+        # Brute force over the whole day, one point per 1/32 degree of hour angle.
+        hour_angle = np.radians(np.linspace(-180, 180, 11521))
+        lat, decline = np.radians(self.lat), np.radians(self.decline)
+        cos_zenith = (np.sin(lat) * np.sin(decline))[..., np.newaxis] + (
+            np.cos(lat) * np.cos(decline)
+        )[..., np.newaxis] * np.cos(hour_angle)
+        with np.errstate(divide="ignore", over="ignore"):
+            values = np.where(cos_zenith > 0, irradiance(cos_zenith), 0)
+        return np.trapezoid(values, hour_angle, axis=-1) * 12 / np.pi
+
+    def test_extraterrestrial(self):
+        expected = self._integral(lambda c: 1361.0 * c)
+        result = sunriset.insolation.extraterrestrial(self.lat, self.decline, 1.0)
+
+        np.testing.assert_allclose(result, expected, rtol=0, atol=0.01)
+        self.assertEqual(result[0, 4], 0)
+        self.assertAlmostEqual(result[2, 2], 24 / np.pi * 1361.0, places=9)
+
+    def test_clear_sky(self):
+        expected = self._integral(lambda c: 1098 * c * np.exp(-0.059 / c))
+        result = sunriset.insolation.clear_sky(self.lat, self.decline)
+
+        np.testing.assert_allclose(result, expected, rtol=2e-4, atol=0.01)
+        single = sunriset.insolation.clear_sky(self.lat, self.decline,
+                                               dtype=np.float32)
+        self.assertEqual(single.dtype, np.float32)
+        np.testing.assert_allclose(single, result, rtol=1e-5, atol=0.01)
+
+    def test_daily_and_monthly(self):
+        start_date = datetime.date(2019, 1, 1)
+        lat, local_tz = [34.05, -33.87, 78.22], [-8, 10, 1]
+        dates, daily = sunriset.daily_insolation(start_date, lat, local_tz, 1,
+                                                 batch_days=100)
+        months, monthly = sunriset.monthly_insolation(start_date, lat, local_tz, 1)
+
+        self.assertEqual(daily["Clear Sky Insolation (Wh/m2)"].shape, (3, 365))
+        self.assertEqual(list(months), list(pd.date_range(start_date, periods=12,
+                                                          freq="MS")))
+        january = slice(0, 31)
+        for name in sunriset.insolation.INSOLATION_COLUMNS:
+            np.testing.assert_allclose(monthly[name][:, 0],
+                                       daily[name][:, january].sum(axis=1))
+            np.testing.assert_allclose(monthly[name].sum(axis=1),
+                                       daily[name].sum(axis=1))
+        self.assertEqual(monthly["Extraterrestrial Insolation (Wh/m2)"][2, 0], 0)
+
+        ephemeris = sunriset.to_pandas(start_date, 34.05, -118.24, -8, 1,
+                                       ["Solar Decline", "Solar Radius Vector AUs"])
+        expected = sunriset.insolation.extraterrestrial(
+            34.05, ephemeris["Solar Decline"].values,
+            ephemeris["Solar Radius Vector AUs"].values)
+        np.testing.assert_allclose(daily["Extraterrestrial Insolation (Wh/m2)"][0],
+                                   expected)
+        with self.assertRaises(ValueError):
+            sunriset.daily_insolation(start_date, lat, local_tz, 1, ["Sunrise"])
+
+
+class TestOrientation(unittest.TestCase):
+    def test_incidence(self):
+        tilt, azimuth = sunriset.orientation.grid([0, 30, 90], [90, 180])
+        zenith, sun_azimuth = np.array([0.0, 30.0, 60.0, 89.0]), np.array([0, 90, 180, 270])
+        result = sunriset.orientation.incidence(tilt, azimuth, zenith, sun_azimuth)
+
+        self.assertEqual(result.shape, (6, 4))
+        np.testing.assert_allclose(result[:2], [zenith, zenith], atol=1e-9)
+        for i, (b, g) in enumerate(zip(tilt, azimuth)):
+            for j, (z, a) in enumerate(zip(zenith, sun_azimuth)):
+                cosine = (math.cos(math.radians(z)) * math.cos(math.radians(b))
+                          + math.sin(math.radians(z)) * math.sin(math.radians(b))
+                          * math.cos(math.radians(a - g)))
+                self.assertAlmostEqual(result[i, j], math.degrees(math.acos(cosine)))
+
+    def test_exposure_chunks(self):
+        rng = np.random.default_rng(0)
+        zenith, sun_azimuth = rng.uniform(0, 120, 1000), rng.uniform(0, 360, 1000)
+        weights = rng.uniform(0, 1, 1000)
+        tilt, azimuth = sunriset.orientation.grid()
+        cosine = sunriset.orientation.cos_incidence(tilt, azimuth, zenith, sun_azimuth)
+        expected = np.maximum(cosine, 0)[:, zenith < 90] @ weights[zenith < 90]
+
+        for max_bytes in (sunriset.orientation.MAX_BYTES, 8 * len(tilt) * 7, 1):
+            result = sunriset.orientation.exposure(tilt, azimuth, zenith, sun_azimuth,
+                                                   weights, max_bytes)
+            np.testing.assert_allclose(result, expected)
+        best = sunriset.orientation.best_orientation(
+            tilt, azimuth, np.stack([zenith, zenith]),
+            np.stack([sun_azimuth, sun_azimuth]), weights, max_bytes=4096)
+        np.testing.assert_array_equal(best[0], tilt[np.argmax(expected)])
+        np.testing.assert_allclose(best[2], expected.max())
+
+    def test_sweep(self):
+        result = sunriset.orientation.sweep(datetime.date(2019, 1, 1),
+                                            [34.05, -33.87, 0.0], [-118.24, 151.21, 0.0],
+                                            [-8, 10, 0], 1, freq="30min")
+
+        self.assertEqual(list(result["Azimuth (degrees cw from North)"][:2]), [180, 0])
+        self.assertTrue((result["Tilt (degrees)"][:2] > 20).all())
+        self.assertEqual(result["Tilt (degrees)"][2], 0)
+        self.assertTrue((result["Exposure (hours)"] > 2000).all())
+
+
+class TestWindow(unittest.TestCase):
+    def setUp(self):
+        self.start_date = datetime.date(2019, 1, 1)
+        self.site = (34.05, -118.24, -8)
+        self.azimuth = np.arange(0, 360, 5)
+
+    def test_flat_horizon(self):
+        window = sunriset.window.solar_windows(self.start_date, *self.site, 1,
+                                               self.azimuth, 0).loc[0]
+        events = sunriset.twilight(self.start_date, *self.site, 1,
+                                   zeniths={"Sunrise": 90.833})
+
+        second = np.timedelta64(1, "s")
+        for name, event in [("Sun Up", "Rising"), ("Sun Down", "Setting")]:
+            error = (window[name].values - events["Sunrise " + event].values) / second
+            self.assertLess(np.abs(error).max(), 10)
+        # The Sunrise and Sunset columns are less exact, as the docstring says.
+        columns = sunriset.to_pandas(self.start_date, *self.site, 1,
+                                     ["Sunrise", "Sunset"])
+        for name, column in [("Sun Up", "Sunrise"), ("Sun Down", "Sunset")]:
+            error = (window[name].values - columns[column].values) / second
+            self.assertLess(np.abs(error).max(), 20)
+        daylight = (window["Sun Down"] - window["Sun Up"]) / pd.Timedelta(minutes=1)
+        np.testing.assert_allclose(window["Direct Sun (minutes)"], daylight, atol=1e-6)
+
+    def test_skyline(self):
+        east = np.where((self.azimuth >= 60) & (self.azimuth <= 130), 20.0, 0.0)
+        notch = np.where((self.azimuth >= 170) & (self.azimuth <= 190), 0.0, 80.0)
+        profiles = np.stack([np.zeros(len(self.azimuth)), east, notch,
+                             np.full(len(self.azimuth), 90.0)])
+        window = sunriset.window.solar_windows(self.start_date, *self.site, 1,
+                                               self.azimuth, profiles)
+        flat, shaded, narrow, walled = (window.loc[site] for site in range(4))
+
+        self.assertEqual(len(window), 4 * 365)
+        self.assertTrue((shaded["Sun Up"] > flat["Sun Up"] + pd.Timedelta(hours=1)).all())
+        pd.testing.assert_series_equal(shaded["Sun Down"], flat["Sun Down"])
+        lost = (shaded["Sun Up"] - flat["Sun Up"]) / pd.Timedelta(minutes=1)
+        np.testing.assert_allclose(flat["Direct Sun (minutes)"]
+                                   - shaded["Direct Sun (minutes)"], lost, atol=1e-6)
+        self.assertTrue((narrow["Direct Sun (minutes)"] < 90).all())
+        self.assertTrue((narrow["Direct Sun (minutes)"] > 0).all())
+        self.assertTrue(walled["Sun Up"].isna().all())
+        self.assertTrue((walled["Direct Sun (minutes)"] == 0).all())
+
+    def test_polar(self):
+        window = sunriset.window.solar_windows(self.start_date, 78.22, 15.65, 1, 1,
+                                               self.azimuth, 0, freq="10min").loc[0]
+
+        self.assertTrue(pd.isna(window.loc["2019-01-01", "Sun Up"]))
+        self.assertEqual(window.loc["2019-01-01", "Direct Sun (minutes)"], 0)
+        self.assertTrue(pd.isna(window.loc["2019-06-21", "Sun Down"]))
+        self.assertAlmostEqual(window.loc["2019-06-21", "Direct Sun (minutes)"], 1440)
+        with self.assertRaises(ValueError):
+            sunriset.window.time_grid("0min")
+
 
 class TestCalc(unittest.TestCase):
     def test_make_time(self):
@@ -50,6 +1118,12 @@ class TestCalc(unittest.TestCase):
         self.assertEqual((result2), datetime.timedelta(days=36, seconds=43200))
         self.assertNotEqual((result2), datetime.timedelta(days=36, seconds = 0))
 
+    def test_make_date_time(self):
+        result = sunriset.calc.make_date_time(0.25, datetime.date(2019, 7, 1), -8,
+                                              "America/Los_Angeles")
+
+        self.assertEqual(result.isoformat(), "2019-07-01T07:00:00-07:00")
+
     def test_julian_day(self):
         usr_date = datetime.date(2021,5,31)
         tz = -2
@@ -68,6 +1142,66 @@ class TestCalc(unittest.TestCase):
         self.assertNotEqual((result), 1.24)
 
 
+class TestVcalc(unittest.TestCase):
+    def setUp(self):
+        start = datetime.date(1890, 1, 1)
+        self.dates = [start + datetime.timedelta(days=i) for i in range(0, 80000, 97)]
+
+    def _chain(self, m, date, lat, long, local_tz):
+        jd = m.julian_day(date, local_tz)
+        jc = m.julian_century(jd)
+        sgml = m.solar_geometric_mean_longitude(jc)
+        sgma = m.solar_geometric_mean_anomaly(jc)
+        eceo = m.eccentricity_earth_orbit(jc)
+        seoc = m.solar_equation_of_center(jc, sgma)
+        stan = m.solar_true_anomaly(sgma, seoc)
+        salg = m.solar_apparent_longitude(m.solar_true_longitude(sgml, seoc), jc)
+        ocor = m.obliquity_correction_deg(m.mean_obliquity_ecliptic(jc), jc)
+        sdec = m.solar_decline(ocor, salg)
+        eqtm = m.equation_of_time(m.var_y(ocor), sgml, eceo, sgma)
+        hans = m.hour_angle_sunrise(lat, sdec)
+        soln = m.solar_noon_float(eqtm, long, local_tz)
+        hand = m.hour_angle_deg(m.true_solar_time_min(eqtm, long, local_tz))
+        szen = m.solar_zenith_angle(lat, sdec, hand)
+        sela = m.solar_elevation_angle(szen)
+        return [
+            jd,
+            jc,
+            m.solar_radius_vector_aus(eceo, stan),
+            m.solar_accent_return(salg, ocor),
+            sdec,
+            eqtm,
+            m.sunrise_float(soln, hans),
+            m.sunset_float(soln, hans),
+            m.sunlight_duration(hans),
+            szen,
+            m.solar_elevation_corrected_atm_refraction(
+                m.approx_atmospheric_refraction(sela), sela
+            ),
+            m.solar_azimuth(hand, lat, szen, sdec),
+        ]
+
+    def test_matches_scalar_chain(self):
+        for lat, long, local_tz in [(34.0522, -118.2437, -8), (-33.87, 151.21, 10)]:
+            vector = self._chain(sunriset.vcalc, self.dates, lat, long, local_tz)
+            scalar = np.array(
+                [self._chain(sunriset.calc, d, lat, long, local_tz) for d in self.dates]
+            ).T
+            for v, s in zip(vector, scalar):
+                np.testing.assert_allclose(v, s, rtol=0, atol=1e-8)
+
+    def test_approx_atmospheric_refraction_branches(self):
+        elevations = np.linspace(-10, 90, 401)
+        expected = [sunriset.calc.approx_atmospheric_refraction(e) for e in elevations]
+        result = sunriset.vcalc.approx_atmospheric_refraction(elevations)
+        np.testing.assert_allclose(result, expected, rtol=0, atol=1e-12)
+
+    def test_make_time(self):
+        result = sunriset.vcalc.make_time(np.array([35.5, np.nan]), None, 1)
+        self.assertEqual(result[0], np.timedelta64(datetime.timedelta(days=36.5)))
+        self.assertTrue(np.isnat(result[1]))
+
+
 if __name__ == '__main__':
     unittest.main()
 